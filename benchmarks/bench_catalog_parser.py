@@ -0,0 +1,131 @@
+"""
+カテゴリページの抽出処理の一致確認と速度比較
+
+utils.catalog_parser.iter_items を、以前の3つの実装（parse_req.py の正規表現、
+scrape_zeropro の ITEM_PATTERN、create_member_list の BeautifulSoup）と比べる。
+--hash を指定するとクラス名のハッシュを差し替えたページで比べる。
+
+使い方:
+  python -m benchmarks.bench_catalog_parser                   # 5000 商品の合成ページ
+  python -m benchmarks.bench_catalog_parser --html saved.html --repeat 20
+  python -m benchmarks.bench_catalog_parser --hash 0a1b2c3d   # ハッシュが変わった場合
+"""
+import argparse
+import io
+import re
+import time
+import tracemalloc
+
+from utils.catalog_parser import iter_items
+from benchmarks.shop_server import render_category_page
+
+SHOP_HASH = "5c97110f"
+
+PARSE_REQ_PATTERN = re.compile(
+    r'<a class="items-grid_anchor_[^"]*" href="([^"]*)"[^>]*>.*?<p class="items-grid_itemTitleText_[^"]*">([^<]*)</p>',
+    re.DOTALL
+)
+SCRAPE_PATTERN = re.compile(
+    r'<a\s+class="items-grid_anchor_[^"]*"\s+href="([^"]*)"[^>]*?>'
+    r'.*?'
+    r'<p\s+class="items-grid_itemTitleText_[^"]*">([^<]*)</p>',
+    re.DOTALL
+)
+
+
+def parse_req_regex(html):
+    return [(m.group(1), m.group(2).strip()) for m in PARSE_REQ_PATTERN.finditer(html.decode("utf-8"))]
+
+
+def scrape_regex(html):
+    return [(m.group(1), (m.group(2) or "").strip()) for m in SCRAPE_PATTERN.finditer(html.decode("utf-8"))]
+
+
+def member_list_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html.decode("utf-8"), 'html.parser')
+    items = []
+    for a_element in soup.find_all('a', class_='items-grid_anchor_5c97110f js-anchor'):
+        title_element = a_element.find('p', class_='items-grid_itemTitleText_5c97110f')
+        if title_element:
+            items.append((a_element.get('href'), title_element.text.strip()))
+    return items
+
+
+def catalog_parser(html):
+    return [(item["url"], item["title"]) for item in iter_items(html)]
+
+
+def catalog_parser_stream(html):
+    return [(item["url"], item["title"]) for item in iter_items(io.BytesIO(html))]
+
+
+APPROACHES = {
+    "parse_req": parse_req_regex,
+    "scrape": scrape_regex,
+    "bs4": member_list_bs4,
+    "iter_items": catalog_parser,
+    "stream": catalog_parser_stream,
+}
+
+
+def make_page(items, css_hash):
+    entries = [
+        (f"/items/{100000 + i}", f"【グループ{i % 12}】メンバー{i} トークイベント")
+        for i in range(items)
+    ]
+    return render_category_page(entries).replace(SHOP_HASH, css_hash).encode("utf-8")
+
+
+def measure(parse, html, repeat):
+    """
+    parse を repeat 回実行した1回あたりの時間と、1回分のピークのメモリ確保量を返す
+
+    tracemalloc は処理を遅くするので、時間とは別に計測する。
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed / repeat, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare category page extractors.")
+    parser.add_argument("--html", action="append", help="Saved category page (repeatable)")
+    parser.add_argument("--items", type=int, default=5000, help="Items on the synthetic page (default: 5000)")
+    parser.add_argument("--hash", default=SHOP_HASH, help="CSS hash suffix for the synthetic page")
+    parser.add_argument("--repeat", type=int, default=5, help="Parse count per approach (default: 5)")
+    args = parser.parse_args()
+
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, "rb") as f:
+                pages.append((path, f.read()))
+    else:
+        pages = [(f"{args.items} items, hash {args.hash}", make_page(args.items, args.hash))]
+
+    for label, html in pages:
+        print(f"{label}: {len(html) / 1024:.0f} KB")
+        reference = catalog_parser(html)
+        for name, parse in APPROACHES.items():
+            try:
+                result = parse(html)
+            except ImportError as e:
+                print(f"{name:>10}: skipped ({e})")
+                continue
+            # 件数と内容が iter_items と一致するかを併記する
+            agree = "agree" if result == reference else f"DIFFER ({len(result)} items)"
+            elapsed, peak = measure(parse, html, args.repeat)
+            print(f"{name:>10}: {elapsed * 1000:9.2f} ms/page  peak {peak / 1024:8.0f} KB  {agree}")
+
+
+if __name__ == "__main__":
+    main()
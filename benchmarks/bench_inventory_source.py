@@ -0,0 +1,77 @@
+"""
+在庫状況の取得元（商品ページのHTMLとJSON）の比較
+
+ローカルのショップサーバーに対して、取得元ごとに更新を数回繰り返し、
+更新ごとのリクエスト数・受信バイト数・時間と、JSONで節約できた量を表示する。
+JSONの1回目は基準を取るためにHTMLで取得する。最後の更新の結果が
+HTMLと一致するかも確かめる（在庫は時間で変わるので、境目の数件はずれることがある）。
+
+使い方:
+  python -m benchmarks.bench_inventory_source                          # 100 メンバー, 商品ページ 200KB
+  python -m benchmarks.bench_inventory_source --page-kb 400 --json-missing-rate 0.1
+"""
+import argparse
+import asyncio
+import time
+
+import utils.inventory as inventory
+from utils.fetch_metrics import RefreshReport
+from utils.inventory_source import INVENTORY_SOURCES
+from utils.page_cache import page_cache
+from benchmarks.common import NullProgress, prepare_inventory_for_local
+from benchmarks.shop_server import ShopConfig, ShopServer, members_for
+
+
+def refresh(member_urls, source):
+    counters = inventory.FetchCounters()
+    report = RefreshReport(counters)
+    start = time.perf_counter()
+    data = asyncio.run(inventory.get_inventory_with_progress(
+        member_urls, list(member_urls), NullProgress(), NullProgress(), counters,
+        report=report, source=source
+    ))
+    return data, counters, report.to_dict()["bytes"], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML and JSON inventory sources.")
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--page-kb", type=int, default=200, help="Extra item page size in KB (default: 200)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Server response delay in seconds")
+    parser.add_argument("--json-missing-rate", type=float, default=0.0,
+                        help="Fraction of items whose JSON omits stock counts")
+    parser.add_argument("--refreshes", type=int, default=3, help="Refreshes per source (default: 3)")
+    parser.add_argument("--port", type=int, default=8931)
+    args = parser.parse_args()
+
+    host = "127.0.0.1"
+    prepare_inventory_for_local(host)
+    config = ShopConfig(members=args.members, latency=args.latency, page_kb=args.page_kb,
+                        json_missing_rate=args.json_missing_rate)
+
+    with ShopServer(config, host=host, port=args.port) as base_url:
+        member_urls = members_for(config, base_url)
+        print(f"{'source':>6} {'#':>2} {'requests':>8} {'KB':>8} {'wall_s':>7} {'json':>5} {'html':>5} "
+              f"{'saved_KB':>9} {'saved_s':>8}")
+        latest = {}
+        for name, source_class in INVENTORY_SOURCES.items():
+            page_cache.clear()
+            source = source_class()
+            for i in range(1, args.refreshes + 1):
+                data, counters, received, wall = refresh(member_urls, source)
+                print(f"{name:>6} {i:>2} {counters.requested:>8} {received / 1024:>8.0f} {wall:>7.2f} "
+                      f"{counters.json_pages:>5} {counters.fallbacks:>5} "
+                      f"{counters.bytes_saved / 1024:>9.0f} {counters.seconds_saved:>8.2f}")
+            latest[name] = data
+
+    html, json_data = latest["html"], latest["json"]
+    differ = sum(
+        html[member].get(slot) != status
+        for member, slots in json_data.items() for slot, status in slots.items()
+    )
+    cells = sum(len(slots) for slots in html.values())
+    print(f"last refresh: {cells - differ}/{cells} cells agree")
+
+
+if __name__ == "__main__":
+    main()
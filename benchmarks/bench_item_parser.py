@@ -0,0 +1,55 @@
+"""
+商品ページのパーサーの一致確認と速度比較
+
+使い方:
+  python -m benchmarks.bench_item_parser                 # 同梱のフィクスチャで比較
+  python -m benchmarks.bench_item_parser --html page.html --repeat 500
+"""
+import argparse
+import os
+import sys
+import time
+
+from utils.item_parser import PARSER_BACKENDS
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "item_page.html")
+
+
+def time_backend(parse, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(html)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare item page parser backends.")
+    parser.add_argument("--html", default=FIXTURE, help="HTML file to parse (default: bundled fixture)")
+    parser.add_argument("--repeat", type=int, default=200, help="Parse count per backend (default: 200)")
+    args = parser.parse_args()
+
+    with open(args.html, "r", encoding="utf-8") as f:
+        html = f.read()
+
+    results = {}
+    for name, parse in PARSER_BACKENDS.items():
+        try:
+            results[name] = parse(html)
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+
+    # 全バックエンドが同じ結果を返すことを確認
+    reference = next(iter(results.values()))
+    for name, result in results.items():
+        if result != reference:
+            print(f"ERROR: {name} の結果が一致しません: {result}", file=sys.stderr)
+            sys.exit(1)
+    print(f"{len(reference)} slots, {len(results)} backend(s) agree")
+
+    for name in results:
+        elapsed = time_backend(PARSER_BACKENDS[name], html, args.repeat)
+        print(f"{name:>8}: {elapsed * 1000:.3f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+解析の実行方法（inline / thread / process）ごとの取得スループット比較
+
+ローカルのaiohttpサーバーが同梱のフィクスチャを返し、
+メンバー数を増やしながら get_inventory_with_progress の所要時間を測る。
+
+使い方:
+  python -m benchmarks.bench_parse_pool
+  python -m benchmarks.bench_parse_pool --members 31 100 300 --padding 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from aiohttp import web
+
+import utils.inventory as inventory
+import utils.parse_pool as parse_pool
+from utils.page_cache import page_cache
+from benchmarks.common import NullProgress, prepare_inventory_for_local
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "item_page.html")
+HOST = "127.0.0.1"
+
+
+async def start_server(html, port):
+    async def handle(request):
+        return web.Response(text=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/items/{item_id}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, HOST, port).start()
+    return runner
+
+
+async def run(members, modes, padding_kb, port):
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        html = f.read()
+    # 実際の商品ページに近い大きさにするため説明文を水増しする
+    html = html.replace("</main>", "<p>" + "あ" * (padding_kb * 1024 // 3) + "</p></main>")
+
+    runner = await start_server(html, port)
+    try:
+        print(f"page size: {len(html.encode('utf-8')) // 1024} KB")
+        print(f"{'members':>8} {'mode':>8} {'wall[s]':>8} {'pages/s':>8}")
+        for count in members:
+            member_urls = {
+                f"member{i}": {
+                    "normal": f"http://{HOST}:{port}/items/{i}",
+                    "final": f"http://{HOST}:{port}/items/f{i}",
+                }
+                for i in range(count)
+            }
+            for mode in modes:
+                page_cache.clear()
+                parse_pool.PARSE_EXECUTOR = mode
+                start = time.perf_counter()
+                await inventory.get_inventory_with_progress(
+                    member_urls, list(member_urls), NullProgress(), NullProgress()
+                )
+                elapsed = time.perf_counter() - start
+                print(f"{count:>8} {mode:>8} {elapsed:>8.2f} {count * 2 / elapsed:>8.1f}")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse executors against a local server.")
+    parser.add_argument("--members", type=int, nargs="+", default=[31, 100, 300])
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--padding", type=int, default=200, help="Extra page size in KB (default: 200)")
+    parser.add_argument("--port", type=int, default=8931)
+    args = parser.parse_args()
+
+    prepare_inventory_for_local(HOST)
+
+    asyncio.run(run(args.members, args.modes, args.padding, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+在庫表HTML生成の速度とメモリ確保量の計測
+
+キャッシュが空のとき・前回と同じとき・一部の行だけ変わったときを比べる。
+
+使い方:
+  python -m benchmarks.bench_table_render                    # 1000 メンバー × 28 時間帯
+  python -m benchmarks.bench_table_render --members 3000 --changed 50
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from utils.ui_utils import generate_table_html, render_header, render_member_row
+from benchmarks.shop_server import TIME_SLOTS
+
+STATUSES = ["⚪︎", "◎", "×", "×", "🔒"]
+
+
+def make_table(members, rng):
+    member_list = [{"name": f"メンバー{i}（グループ{i % 12}）"} for i in range(members)]
+    inventory_data = {
+        member["name"]: {slot: rng.choice(STATUSES) for slot in TIME_SLOTS}
+        for member in member_list
+    }
+    member_urls = {
+        member["name"]: {"normal": f"https://example.com/items/{i}", "final": None}
+        for i, member in enumerate(member_list)
+    }
+    return member_list, inventory_data, member_urls
+
+
+def count_sold_out(inventory_data):
+    sold_out_counts = {
+        slot: sum(data[slot] == "×" for data in inventory_data.values()) for slot in TIME_SLOTS
+    }
+    crowded_time_slots = {slot: count >= 15 for slot, count in sold_out_counts.items()}
+    member_sales_count = {
+        name: sum(status == "×" for status in data.values()) for name, data in inventory_data.items()
+    }
+    return sold_out_counts, crowded_time_slots, member_sales_count
+
+
+def render(member_list, inventory_data, member_urls, counts):
+    return generate_table_html(member_list, TIME_SLOTS, inventory_data, member_urls, {}, *counts)
+
+
+def measure(label, func, repeat):
+    """
+    func を repeat 回実行し、1回あたりの時間とメモリ確保量を表示する
+    """
+    elapsed = 0.0
+    tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    print(f"{label:>8}: {elapsed / repeat * 1000:8.2f} ms/render  peak {peak / 1024:8.0f} KB  "
+          f"live blocks {blocks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the inventory table renderer.")
+    parser.add_argument("--members", type=int, default=1000)
+    parser.add_argument("--changed", type=int, default=10, help="Rows changed between renders")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    member_list, inventory_data, member_urls = make_table(args.members, rng)
+    # 集計は表の生成とは別に済ませておく
+    counts = count_sold_out(inventory_data)
+    html = render(member_list, inventory_data, member_urls, counts)
+    print(f"{args.members} members x {len(TIME_SLOTS)} slots, {len(html) / 1024:.0f} KB of HTML")
+
+    def cold():
+        render_member_row.cache_clear()
+        render_header.cache_clear()
+        render(member_list, inventory_data, member_urls, counts)
+
+    def warm():
+        render(member_list, inventory_data, member_urls, counts)
+
+    def changed():
+        for member in rng.sample(member_list, args.changed):
+            inventory_data[member["name"]][rng.choice(TIME_SLOTS)] = rng.choice(STATUSES)
+        render(member_list, inventory_data, member_urls, counts)
+
+    measure("cold", cold, args.repeat)
+    measure("warm", warm, args.repeat)
+    measure(f"{args.changed} rows", changed, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
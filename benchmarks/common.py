@@ -0,0 +1,32 @@
+"""
+ベンチマーク間で共有する補助関数
+"""
+import utils.inventory as inventory
+from utils.fetch_scheduler import HOST_RATE_LIMITS
+
+
+class NullProgress:
+    """
+    st.progress / st.empty の代わりに渡す何もしないオブジェクト
+    """
+
+    def progress(self, value):
+        pass
+
+    def info(self, message):
+        pass
+
+    def success(self, message):
+        pass
+
+
+def prepare_inventory_for_local(host):
+    """
+    ローカルサーバー相手に在庫取得を測れるようにする
+
+    - 指定ホストにはレート制限をかけない
+    - 発売前・鍵閉め後の判定に左右されないようにする
+    """
+    HOST_RATE_LIMITS[host] = (1e9, 10 ** 9)
+    inventory.is_after_sale_start = lambda schedule=None: True
+    inventory.is_after_final_slot_deadline = lambda schedule=None: False
@@ -0,0 +1,191 @@
+"""
+ローカルのショップサーバー相手に在庫取得とカテゴリ取得を計測する
+
+結果は benchmarks/results/ にJSONで保存し、前回の結果と比較する。
+
+使い方:
+  python -m benchmarks.run_benchmarks                        # 31 / 300 / 3000 メンバー
+  python -m benchmarks.run_benchmarks --members 31 --latency 0.05 --error-rate 0.01
+  python -m benchmarks.run_benchmarks --baseline benchmarks/results/20250901-220000.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime
+
+import scrape_zeropro
+import utils.inventory as inventory
+from utils.page_cache import page_cache
+from benchmarks.common import NullProgress, prepare_inventory_for_local
+from benchmarks.shop_server import ShopConfig, ShopServer, members_for
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# 前回より遅くなったとみなす割合
+REGRESSION_THRESHOLD = 0.10
+
+
+def server_requests(base_url):
+    with urllib.request.urlopen(f"{base_url}/_stats") as resp:
+        return json.load(resp)["requests"]
+
+
+def measure(name, members, base_url, func):
+    """
+    func を実行し、実時間・CPU時間・ピークメモリ・リクエスト数を測る
+    """
+    requests_before = server_requests(base_url)
+    tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    func()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    requests = server_requests(base_url) - requests_before
+
+    result = {
+        "name": name,
+        "members": members,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_mb": round(peak / 1024 / 1024, 2),
+        "requests": requests,
+        "rps": round(requests / wall, 1) if wall else 0.0,
+    }
+    print(f"{name:>10} {members:>6} {result['wall_s']:>8.2f} {result['cpu_s']:>8.2f} "
+          f"{result['peak_mb']:>8.1f} {requests:>8} {result['rps']:>8.1f}")
+    return result
+
+
+def bench_inventory(config, base_url):
+    member_urls = members_for(config, base_url)
+
+    def run():
+        page_cache.clear()
+        asyncio.run(inventory.get_inventory_with_progress(
+            member_urls, list(member_urls), NullProgress(), NullProgress()
+        ))
+
+    return measure("inventory", config.members, base_url, run)
+
+
+def bench_catalog(config, base_url):
+    def run():
+        page1 = scrape_zeropro.fetch_page1_items(config.category_id)
+        more = scrape_zeropro.fetch_more_pages(config.category_id, sleep_sec=0)
+        scrape_zeropro.dedup_keep_order(page1 + more)
+
+    return measure("catalog", config.members, base_url, run)
+
+
+def bench_catalog_concurrent(config, base_url):
+    def run():
+        asyncio.run(scrape_zeropro.fetch_all_items_async(config.category_id))
+
+    return measure("catalog_c", config.members, base_url, run)
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def save_results(report):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def latest_results(config):
+    """
+    同じサーバー設定で保存された最新の結果ファイルを返す
+    """
+    for path in sorted(glob.glob(os.path.join(RESULTS_DIR, "*.json")), reverse=True):
+        with open(path, "r", encoding="utf-8") as f:
+            if json.load(f).get("config") == config:
+                return path
+    return None
+
+
+def compare(report, baseline_path):
+    """
+    前回の結果と比較し、実時間が閾値以上に悪化した項目を表示する
+    """
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["name"], r["members"]): r for r in baseline["results"]}
+
+    print(f"\ncompared with {os.path.basename(baseline_path)} ({baseline.get('commit')})")
+    regressions = 0
+    for result in report["results"]:
+        before = previous.get((result["name"], result["members"]))
+        if not before or not before["wall_s"]:
+            continue
+        change = (result["wall_s"] - before["wall_s"]) / before["wall_s"]
+        mark = "REGRESSION" if change > REGRESSION_THRESHOLD else ""
+        regressions += bool(mark)
+        print(f"{result['name']:>10} {result['members']:>6} {before['wall_s']:>8.2f} -> "
+              f"{result['wall_s']:>8.2f} ({change:+.0%}) {mark}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run offline benchmarks against a local stand-in shop.")
+    parser.add_argument("--members", type=int, nargs="+", default=[31, 300, 3000])
+    parser.add_argument("--latency", type=float, default=0.0, help="Server response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of HTTP 503")
+    parser.add_argument("--page-kb", type=int, default=0, help="Extra item page size in KB")
+    parser.add_argument("--skip-catalog", action="store_true", help="Only benchmark the inventory refresh")
+    parser.add_argument("--baseline", help="Results file to compare against (default: latest run)")
+    parser.add_argument("--no-save", action="store_true", help="Do not store this run's results")
+    parser.add_argument("--port", type=int, default=8930)
+    args = parser.parse_args()
+
+    host = "127.0.0.1"
+    prepare_inventory_for_local(host)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {
+            "latency": args.latency, "jitter": args.jitter,
+            "error_rate": args.error_rate, "page_kb": args.page_kb,
+        },
+        "results": [],
+    }
+
+    print(f"{'name':>10} {'members':>6} {'wall[s]':>8} {'cpu[s]':>8} {'peak[MB]':>8} {'requests':>8} {'req/s':>8}")
+    for members in args.members:
+        config = ShopConfig(
+            members=members, latency=args.latency, jitter=args.jitter,
+            error_rate=args.error_rate, page_kb=args.page_kb,
+        )
+        with ShopServer(config, host=host, port=args.port) as base_url:
+            scrape_zeropro.SITE = base_url
+            report["results"].append(bench_inventory(config, base_url))
+            if not args.skip_catalog:
+                report["results"].append(bench_catalog(config, base_url))
+                report["results"].append(bench_catalog_concurrent(config, base_url))
+
+    baseline = args.baseline or latest_results(report["config"])
+    if not args.no_save:
+        print(f"\nsaved: {save_results(report)}")
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+BASEショップの代わりに合成ページを返すローカルサーバー
+
+商品ページ（cot-itemOrder-variationLI のHTMLと、?response_type=json を付けたときの
+バリエーションごとの在庫数のJSON）とカテゴリページ
+（items-grid_anchor_ のHTMLと load_items のJSON）を返す。
+遅延・エラー率・ページサイズ・在庫数が欠けたJSONの割合を指定できる。
+
+使い方:
+  python -m benchmarks.shop_server --members 300 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from utils.time_utils import SLOT_TABLE
+
+
+TIME_SLOTS = list(SLOT_TABLE.labels)
+
+GROUPS = ["まぶだちゅ！", "ぜろぷろ", "研究生"]
+
+# カテゴリのJSONは1ページあたりこの件数
+ITEMS_PER_PAGE = 30
+
+
+@dataclass
+class ShopConfig:
+    """
+    サーバーの設定
+
+    Attributes:
+        members (int): メンバー数（1人あたり15分券と鍵〆パックの2商品）
+        latency (float): 応答までの遅延（秒）
+        jitter (float): 遅延に加えるランダムな揺らぎ（秒）
+        error_rate (float): 503を返す確率
+        page_kb (int): 商品ページに足す水増しの大きさ（KB）
+        json_missing_rate (float): 商品のJSONで在庫数を省く（HTMLでしか分からない）商品の割合
+        category_id (str): カテゴリID
+        seed (int): 在庫状態を決める乱数のシード
+    """
+    members: int = 31
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    page_kb: int = 0
+    json_missing_rate: float = 0.0
+    category_id: str = "5301897"
+    seed: int = 0
+
+
+def member_name(index):
+    return f"メンバー{index:04d}"
+
+
+def member_group(index):
+    return GROUPS[index % len(GROUPS)]
+
+
+def item_ids(index):
+    """
+    メンバーの (15分券, 鍵〆パック) の商品ID
+    """
+    return 100000 + index * 2, 100000 + index * 2 + 1
+
+
+def item_title(item_id):
+    index, is_final = divmod(item_id - 100000, 2)
+    title = f"【{member_group(index)}】{member_name(index)} トークイベント"
+    return title + " 鍵〆パック" if is_final else title
+
+
+def item_variations(item_id, config):
+    """
+    商品の時間帯ごとの在庫数 [(時間帯, 在庫数)]（商品IDと経過時間から決まる）
+    """
+    rng = random.Random(config.seed * 1000003 + item_id)
+    # 時間がたつほど完売が増える
+    sold_ratio = min(0.95, rng.random() * 0.5 + (time.time() % 600) / 1200)
+    variations = []
+    for slot in TIME_SLOTS:
+        roll = rng.random()
+        if roll < sold_ratio:
+            stock = 0
+        elif roll < sold_ratio + 0.1:
+            stock = 1
+        else:
+            stock = 2 + int(roll * 1000) % 9
+        variations.append((slot, stock))
+    return variations
+
+
+def render_item_page(item_id, config):
+    """
+    商品ページのHTMLを作る
+    """
+    rows = []
+    for slot, stock in item_variations(item_id, config):
+        if stock == 0:
+            tail = ('<div class="cot-itemOrder-variationStock">在庫なし</div>'
+                    '<button type="button" class="cot-itemOrder-restockButton"><span>再入荷通知希望</span></button>')
+        elif stock == 1:
+            tail = ('<div class="cot-itemOrder-variationStock"><span>残り1点</span></div>'
+                    '<button type="button" class="cot-itemOrder-cartButton">カートに入れる</button>')
+        else:
+            tail = ('<div class="cot-itemOrder-variationStock">在庫あり</div>'
+                    '<button type="button" class="cot-itemOrder-cartButton">カートに入れる</button>')
+        rows.append(
+            f'<li class="cot-itemOrder-variationLI js-variation">'
+            f'<div class="cot-itemOrder-variationName">{slot}</div>{tail}</li>'
+        )
+    padding = "<p>" + "あ" * (config.page_kb * 1024 // 3) + "</p>" if config.page_kb else ""
+    return (
+        '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">'
+        f'<title>{item_title(item_id)}</title></head><body><main>'
+        f'<h1 class="cot-itemDetail-title">{item_title(item_id)}</h1>{padding}'
+        '<div class="cot-itemOrder"><ul class="cot-itemOrder-variationUL">'
+        + "".join(rows)
+        + '</ul></div></main></body></html>'
+    )
+
+
+def render_item_json(item_id, config):
+    """
+    商品のJSONを作る（json_missing_rate の割合の商品は在庫数を含めない）
+    """
+    missing = random.Random(config.seed * 7919 + item_id).random() < config.json_missing_rate
+    variations = [
+        {"name": slot} if missing else {"name": slot, "stock": stock}
+        for slot, stock in item_variations(item_id, config)
+    ]
+    return json.dumps({"item_id": item_id, "title": item_title(item_id), "variations": variations},
+                      ensure_ascii=False)
+
+
+def category_items(config):
+    """
+    カテゴリに並ぶ商品 (URLパス, タイトル) のリスト
+    """
+    items = []
+    for index in range(config.members):
+        for item_id in item_ids(index):
+            items.append((f"/items/{item_id}", item_title(item_id)))
+    return items
+
+
+def render_category_page(items):
+    anchors = "".join(
+        f'<li class="items-grid_item_5c97110f">'
+        f'<a class="items-grid_anchor_5c97110f js-anchor" href="{href}">'
+        f'<div class="items-grid_image_5c97110f"></div>'
+        f'<p class="items-grid_itemTitleText_5c97110f">{title}</p></a></li>'
+        for href, title in items
+    )
+    return (
+        '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"></head><body>'
+        f'<ul class="items-grid_list_5c97110f">{anchors}</ul></body></html>'
+    )
+
+
+def create_app(config):
+    """
+    設定に従って応答する aiohttp アプリケーションを作る
+    """
+    rng = random.Random(config.seed)
+    items = category_items(config)
+    stats = {"requests": 0, "errors": 0}
+
+    async def delay_or_fail():
+        stats["requests"] += 1
+        if config.latency or config.jitter:
+            await asyncio.sleep(config.latency + rng.random() * config.jitter)
+        if config.error_rate and rng.random() < config.error_rate:
+            stats["errors"] += 1
+            raise web.HTTPServiceUnavailable()
+
+    async def item_page(request):
+        await delay_or_fail()
+        item_id = int(request.match_info["item_id"])
+        if request.query.get("response_type") == "json":
+            return web.Response(text=render_item_json(item_id, config), content_type="application/json")
+        return web.Response(text=render_item_page(item_id, config), content_type="text/html")
+
+    async def category_page(request):
+        await delay_or_fail()
+        if request.match_info["category_id"] != config.category_id:
+            raise web.HTTPNotFound()
+        return web.Response(text=render_category_page(items[:ITEMS_PER_PAGE]), content_type="text/html")
+
+    async def load_items(request):
+        await delay_or_fail()
+        page = int(request.match_info["page"])
+        start = (page - 1) * ITEMS_PER_PAGE
+        if request.match_info["category_id"] != config.category_id or start >= len(items):
+            raise web.HTTPNotFound()
+        data = [{"title": title, "url": href} for href, title in items[start:start + ITEMS_PER_PAGE]]
+        return web.Response(text=json.dumps(data, ensure_ascii=False), content_type="application/json")
+
+    async def server_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_get("/items/{item_id}", item_page)
+    app.router.add_get("/categories/{category_id}", category_page)
+    app.router.add_get("/load_items/categories/{category_id}/{page}", load_items)
+    app.router.add_get("/_stats", server_stats)
+    return app
+
+
+def members_for(config, base_url):
+    """
+    get_inventory_with_progress に渡すメンバー名とURLの辞書
+    """
+    member_urls = {}
+    for index in range(config.members):
+        normal_id, final_id = item_ids(index)
+        member_urls[member_name(index)] = {
+            "normal": f"{base_url}/items/{normal_id}",
+            "final": f"{base_url}/items/{final_id}",
+        }
+    return member_urls
+
+
+def _serve(config, host, port, ready):
+    async def run():
+        runner = web.AppRunner(create_app(config), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        ready.set()
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+class ShopServer:
+    """
+    別プロセスでサーバーを起動する（計測対象とCPU・メモリを分けるため）
+
+    with ShopServer(config) as base_url: ... の形で使う。
+    """
+
+    def __init__(self, config, host="127.0.0.1", port=8930):
+        self.config = config
+        self.host = host
+        self.port = port
+        self._process = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        ready = multiprocessing.Event()
+        self._process = multiprocessing.Process(
+            target=_serve, args=(self.config, self.host, self.port, ready), daemon=True
+        )
+        self._process.start()
+        if not ready.wait(timeout=10):
+            self._process.terminate()
+            raise RuntimeError("ショップサーバーの起動に失敗しました")
+        return self.base_url
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve synthetic BASE shop pages locally.")
+    parser.add_argument("--members", type=int, default=31)
+    parser.add_argument("--latency", type=float, default=0.0, help="Response delay in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of HTTP 503")
+    parser.add_argument("--page-kb", type=int, default=0, help="Extra item page size in KB")
+    parser.add_argument("--json-missing-rate", type=float, default=0.0,
+                        help="Fraction of items whose JSON omits stock counts")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8930)
+    args = parser.parse_args()
+
+    config = ShopConfig(
+        members=args.members, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, page_kb=args.page_kb, json_missing_rate=args.json_missing_rate,
+    )
+    web.run_app(create_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
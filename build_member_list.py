@@ -0,0 +1,389 @@
+"""
+カテゴリページから members.csv までを1回で作る
+
+scrape_zeropro.py（item.csv）→ fix_member_list.py（members.csv）の代わりに、
+取得した商品をその場でメンバーごとにまとめ、中間ファイルなしで members.csv を書き換える。
+書き込みは同じディレクトリの一時ファイルからの置き換えで行うので、
+動作中のアプリが書きかけのファイルを読むことはない。
+
+--sync では前回の取得状態（catalog_state.json）を使い、内容が変わったページだけを
+読み直して、既存の members.csv にメンバーの追加・削除・URL変更だけを反映する。
+
+使い方:
+  python build_member_list.py                        # members.csv を作り直す
+  python build_member_list.py --output - --category 5301897
+  python build_member_list.py --sequential --sleep 0.7
+  python build_member_list.py --sync                 # 変更分だけ反映（イベント中に定期実行する用）
+"""
+import os
+import re
+import csv
+import sys
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+import scrape_zeropro
+from utils.fetch_engine import get_fetch_engine
+from utils.http_client import FetchError, fetch_page
+
+FIELDNAMES = ["url_1hour", "url_15min", "name", "group"]
+
+STATE_FILE = "catalog_state.json"
+
+# 【グループ名】メンバー名 トークイベント
+TITLE_PATTERN = re.compile(r'【(.+?)】(.+?)\s+トークイベント')
+
+
+def extract_member_info(title: str) -> Tuple[Optional[str], Optional[str]]:
+    """タイトルからグループ名とメンバー名を抽出"""
+    match = TITLE_PATTERN.match(title)
+    if match:
+        return match.group(1).strip(), match.group(2).strip()
+    return None, None
+
+
+def iter_catalog_items(category_id: str, concurrent: bool = True, sleep_sec: float = 0.7,
+                       timeout: int = 20) -> Iterator[Dict[str, str]]:
+    """カテゴリの商品を表示順に返す（URLの重複は除く）"""
+    if concurrent:
+        yield from scrape_zeropro.fetch_all_items(category_id, timeout=timeout)
+        return
+
+    seen = set()
+    page1 = scrape_zeropro.fetch_page1_items(category_id, timeout=timeout)
+    more = scrape_zeropro.iter_more_pages(category_id, sleep_sec=sleep_sec, timeout=timeout)
+    for items in (page1, more):
+        for item in items:
+            if item["url"] not in seen:
+                seen.add(item["url"])
+                yield item
+
+
+def iter_tickets(items: Iterable[Dict[str, str]]) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    商品を (メンバー名, グループ名, 種別, URL) にする
+
+    種別は鍵〆パックなら "url_1hour"、それ以外は "url_15min"。
+    トークイベント以外の商品は読み飛ばす。
+    """
+    for item in items:
+        title = item["title"]
+        group, name = extract_member_info(title)
+        if not group or not name:
+            continue
+        kind = "url_1hour" if "鍵〆" in title else "url_15min"
+        yield name, group, kind, item["url"]
+
+
+def merge_members(tickets: Iterable[Tuple[str, str, str, str]]) -> List[Dict[str, str]]:
+    """
+    メンバーごとに1時間・15分のURLをまとめる（初めて登場した順）
+
+    1時間チケットがないメンバーは15分のURLを両方に入れる。
+    """
+    members: Dict[str, Dict[str, str]] = {}
+    for name, group, kind, url in tickets:
+        member = members.setdefault(name, {"url_1hour": "", "url_15min": "", "name": name, "group": ""})
+        member["group"] = group
+        member[kind] = url
+
+    for member in members.values():
+        if not member["url_1hour"] and member["url_15min"]:
+            member["url_1hour"] = member["url_15min"]
+    return list(members.values())
+
+
+def _file_mode(path: str) -> int:
+    """
+    置き換え後のファイルに付けるパーミッション
+
+    mkstemp の一時ファイルは 0600 なので、既存ファイルがあればそのモードを、
+    なければ通常の open と同じ umask 適用後のモードを返す。
+    """
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def write_members_csv(rows: Iterable[Dict[str, str]], path: str) -> int:
+    """
+    members.csv を書き換える（一時ファイルに書いてから置き換える）
+
+    Returns:
+        書き込んだ行数
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".members-", suffix=".csv", dir=directory)
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return count
+
+
+def load_state(path: str) -> Dict:
+    """前回の取得状態を読む（なければ空の状態）"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"items": {}, "pages": {}}
+
+
+def save_state(state: Dict, path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".catalog-state-", suffix=".json", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def fetch_page_if_changed(session: aiohttp.ClientSession, url: str, parse, previous: Optional[Dict],
+                                stats: Dict[str, int], timeout: int = 20,
+                                semaphore: Optional[asyncio.Semaphore] = None) -> Tuple[Optional[Dict], bool]:
+    """
+    ページを取得し、前回から変わっていなければ前回の商品一覧を使う
+
+    ETag / Last-Modified があれば条件付きリクエストにし、
+    なければ本文のハッシュで変化を判定する。parse は本文（bytes）を受け取る。
+
+    Returns:
+        (ページの状態, 終端かどうか)。終端（404・空・JSONでない）なら状態はNone
+    """
+    headers = dict(scrape_zeropro.HEADERS)
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+
+    resp = await fetch_page(session, url, headers=headers, semaphore=semaphore,
+                            timeout=aiohttp.ClientTimeout(total=timeout))
+    if resp.status == 304 and previous:
+        stats["not_modified"] += 1
+        return previous, False
+    if resp.status == 404:
+        return None, True
+    if resp.status != 200:
+        raise FetchError(f"HTTP {resp.status}")
+
+    body_hash = hashlib.blake2b(resp.body, digest_size=16).hexdigest()
+    if previous and previous.get("hash") == body_hash:
+        stats["unchanged"] += 1
+        items = previous["items"]
+    else:
+        items = parse(resp.body)
+        if items is None:
+            return None, True
+        stats["parsed"] += 1
+
+    return {
+        "etag": resp.headers.get("ETag"),
+        "last_modified": resp.headers.get("Last-Modified"),
+        "hash": body_hash,
+        "items": items,
+    }, False
+
+
+def _parse_page1(body: bytes) -> List[Dict[str, str]]:
+    return scrape_zeropro.parse_page1_items(body.decode("utf-8", errors="replace"))
+
+
+async def _sync_pages(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, category_id: str,
+                      previous_pages: Dict[str, Dict], stats: Dict[str, int], sleep_sec: float,
+                      timeout: int) -> Dict[str, Dict]:
+    pages: Dict[str, Dict] = {}
+
+    page_url = scrape_zeropro.page1_url(category_id)
+    page, _ = await fetch_page_if_changed(
+        session, page_url, _parse_page1, previous_pages.get(page_url), stats, timeout, semaphore
+    )
+    stats["fetched"] += 1
+    if page is not None:
+        pages[page_url] = page
+
+    page_number = 2
+    while True:
+        page_url = scrape_zeropro.json_page_url(category_id, page_number)
+        page, end = await fetch_page_if_changed(
+            session, page_url, scrape_zeropro.parse_json_page, previous_pages.get(page_url), stats, timeout,
+            semaphore
+        )
+        stats["fetched"] += 1
+        if end:
+            break
+        pages[page_url] = page
+        page_number += 1
+        await asyncio.sleep(sleep_sec)
+    return pages
+
+
+def sync_catalog(category_id: str, state: Dict, sleep_sec: float = 0.7,
+                 timeout: int = 20) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+    """
+    前回の状態を使ってカテゴリの商品一覧を取り直す（state は更新される）
+
+    取得は在庫取得と共有の取得エンジン（utils.fetch_engine）で行う。
+
+    Returns:
+        (商品一覧（URL重複なし、表示順）, 取得結果の内訳)
+    """
+    stats = {"fetched": 0, "not_modified": 0, "unchanged": 0, "parsed": 0}
+    previous_pages = state.get("pages", {})
+    pages = get_fetch_engine().run(lambda session, semaphore: _sync_pages(
+        session, semaphore, category_id, previous_pages, stats, sleep_sec, timeout
+    ))
+
+    items = []
+    seen = set()
+    for page in pages.values():
+        for item in page["items"]:
+            if item["url"] not in seen:
+                seen.add(item["url"])
+                items.append(item)
+
+    # 初めて見た時刻を残しつつ、カタログから消えた商品は状態からも消す
+    now = time.time()
+    previous_items = state.get("items", {})
+    state["items"] = {
+        item["url"]: {
+            "title": item["title"],
+            "first_seen": previous_items.get(item["url"], {}).get("first_seen", now),
+        }
+        for item in items
+    }
+    state["pages"] = pages
+    return items, stats
+
+
+def read_members_csv(path: str) -> List[Dict[str, str]]:
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return [dict(zip(FIELDNAMES, row)) for row in list(csv.reader(f))[1:] if len(row) >= 4]
+    except FileNotFoundError:
+        return []
+
+
+def diff_members(current: List[Dict[str, str]],
+                 latest: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Dict[str, List[str]]]:
+    """
+    既存の members.csv の行に最新の内容を反映する
+
+    既存のメンバーは今の並び順のまま、新しいメンバーは末尾（カタログ順）に追加し、
+    カタログから消えたメンバーは削除する。
+
+    Returns:
+        (新しい行, {"added": [...], "removed": [...], "updated": [...]})
+    """
+    latest_by_name = {row["name"]: row for row in latest}
+    current_names = {row["name"] for row in current}
+    rows = []
+    changes: Dict[str, List[str]] = {"added": [], "removed": [], "updated": []}
+
+    for row in current:
+        new_row = latest_by_name.get(row["name"])
+        if new_row is None:
+            changes["removed"].append(row["name"])
+            continue
+        if new_row != row:
+            changes["updated"].append(row["name"])
+        rows.append(new_row)
+
+    for row in latest:
+        if row["name"] not in current_names:
+            changes["added"].append(row["name"])
+            rows.append(row)
+    return rows, changes
+
+
+def sync_members(category_id: str, members_path: str = "members.csv", state_path: str = STATE_FILE,
+                 sleep_sec: float = 0.7, timeout: int = 20) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+    """
+    カタログの変更分だけを members.csv に反映する（変更がなければ書き込まない）
+
+    Returns:
+        (メンバーの変更内容, ページの取得結果の内訳)
+    """
+    state = load_state(state_path)
+    items, stats = sync_catalog(category_id, state, sleep_sec=sleep_sec, timeout=timeout)
+    rows, changes = diff_members(read_members_csv(members_path), merge_members(iter_tickets(items)))
+    if any(changes.values()) or not os.path.exists(members_path):
+        write_members_csv(rows, members_path)
+    save_state(state, state_path)
+    return changes, stats
+
+
+def build_members(category_id: str, concurrent: bool = True, sleep_sec: float = 0.7,
+                  timeout: int = 20) -> List[Dict[str, str]]:
+    """カテゴリの商品から members.csv の行を作る"""
+    items = iter_catalog_items(category_id, concurrent=concurrent, sleep_sec=sleep_sec, timeout=timeout)
+    return merge_members(iter_tickets(items))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build members.csv directly from a shop category.")
+    parser.add_argument("--category", default="5301897", help="Category ID (default: 5301897)")
+    parser.add_argument("--output", default="members.csv", help="Output path, or - for stdout (default: members.csv)")
+    parser.add_argument("--timeout", type=int, default=20, help="HTTP timeout seconds (default: 20)")
+    parser.add_argument("--sequential", action="store_true", help="Fetch JSON pages one at a time")
+    parser.add_argument("--sleep", type=float, default=0.7,
+                        help="Sleep seconds between JSON pages in --sequential/--sync mode (default: 0.7)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Only apply catalog changes to the existing output, using the saved state")
+    parser.add_argument("--state", default=STATE_FILE, help=f"Catalog state file for --sync (default: {STATE_FILE})")
+    args = parser.parse_args()
+
+    try:
+        if args.sync:
+            changes, stats = sync_members(args.category, args.output, args.state,
+                                          sleep_sec=args.sleep, timeout=args.timeout)
+            print(f"pages: {stats['fetched']} fetched, {stats['not_modified']} not modified, "
+                  f"{stats['unchanged']} unchanged, {stats['parsed']} parsed", file=sys.stderr)
+            for kind in ("added", "removed", "updated"):
+                for name in changes[kind]:
+                    print(f"{kind}: {name}", file=sys.stderr)
+            if not any(changes.values()):
+                print("no member changes", file=sys.stderr)
+            return
+
+        rows = build_members(args.category, concurrent=not args.sequential,
+                             sleep_sec=args.sleep, timeout=args.timeout)
+        if args.output == "-":
+            writer = csv.DictWriter(sys.stdout, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            count = write_members_csv(rows, args.output)
+            print(f"{args.output}: {count}人", file=sys.stderr)
+
+    except Exception as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,38 @@
-from bs4 import BeautifulSoup
 import re
 import csv
 import sys
 import logging
 import os
 
+from utils.catalog_parser import iter_items
+
 # ログ設定: INFOレベル以上のログを、タイムスタンプ付きで出力する
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 def extract_member_info(html_content):
     """
     HTMLコンテンツからメンバーのURL、名前、コードを抽出する関数
+
+    html_content は文字列・バイト列のほか、バイナリモードで開いたファイルでもよい
     """
     logging.info("HTML解析を開始します。")
-    soup = BeautifulSoup(html_content, 'html.parser')
     members = []
-    # a要素をすべて取得
-    a_elements = soup.find_all('a', class_='items-grid_anchor_5c97110f js-anchor')
-    logging.info(f"見つかったaタグの数: {len(a_elements)}")
-    
-    for idx, a_element in enumerate(a_elements, start=1):
-        url = a_element.get('href')
-        title_element = a_element.find('p', class_='items-grid_itemTitleText_5c97110f')
-        if title_element:
-            title_text = title_element.text
-            # "【まぶだちゅ！】白咲 ひとみ トークイベント" や "【研究生】名前 トークイベント" からグループ名と名前を抽出
-            match = re.search(r'【(.+?)】(.*?) トークイベント', title_text)
-            if match:
-                member_code = match.group(1)  # グループ名部分
-                member_name = match.group(2)  # 名前部分
-                members.append((url, member_name, member_code))
-                logging.info(f"{idx}番目のメンバー: {member_name} ({member_code}) - {url} を抽出しました。")
-            else:
-                logging.warning(f"{idx}番目のaタグでメンバー名抽出に失敗しました。テキスト: {title_text}")
+    idx = 0
+    # 商品のaタグとタイトルを順に取得
+    for idx, item in enumerate(iter_items(html_content), start=1):
+        url = item["url"]
+        title_text = item["title"]
+        # "【まぶだちゅ！】白咲 ひとみ トークイベント" や "【研究生】名前 トークイベント" からグループ名と名前を抽出
+        match = re.search(r'【(.+?)】(.*?) トークイベント', title_text)
+        if match:
+            member_code = match.group(1)  # グループ名部分
+            member_name = match.group(2)  # 名前部分
+            members.append((url, member_name, member_code))
+            logging.info(f"{idx}番目のメンバー: {member_name} ({member_code}) - {url} を抽出しました。")
         else:
-            logging.warning(f"{idx}番目のaタグにタイトル要素が見つかりませんでした。")
-    
+            logging.warning(f"{idx}番目の商品でメンバー名抽出に失敗しました。テキスト: {title_text}")
+    logging.info(f"見つかった商品の数: {idx}")
+
     logging.info("HTML解析を完了しました。")
     return members
 
@@ -128,18 +125,14 @@ def main():
         logging.error(f"指定されたファイル {input_filename} が見つかりません。")
         sys.exit(1)
     
-    # ファイル読み込み
+    # ファイルを読み込みながらメンバー情報を抽出
     logging.info(f"入力ファイル {input_filename} を読み込みます。")
     try:
-        with open(input_filename, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        logging.info("HTMLコンテンツの読み込みが完了しました。")
-    except Exception as e:
+        with open(input_filename, 'rb') as f:
+            members = extract_member_info(f)
+    except OSError as e:
         logging.error(f"ファイルの読み込みに失敗しました: {e}")
         sys.exit(1)
-    
-    # メンバー情報を抽出
-    members = extract_member_info(html_content)
     logging.info(f"合計{len(members)}人のメンバーが見つかりました。")
     
     # 一時CSVに保存
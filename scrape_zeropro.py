@@ -3,51 +3,61 @@
   python scrape_zeropro.py                       # 標準出力にCSV
   python scrape_zeropro.py --save items.csv      # items.csv に保存
   python scrape_zeropro.py --category 5301897    # カテゴリIDを変えたい場合
+  python scrape_zeropro.py --concurrent          # 複数ページを並列に先読みして取得
 """
 import re
 import csv
 import sys
+import json
 import time
+import asyncio
 import argparse
-from typing import List, Dict
+from typing import Dict, Iterator, List, Optional
 from urllib.parse import urljoin
 
-import requests
+import aiohttp
+
+from utils.catalog_parser import iter_items
+from utils.fetch_engine import get_fetch_engine
+from utils.http_client import FetchError, create_session, fetch_page
 
 SITE = "https://zeroproz2a.base.shop"
 HEADERS = {
     "User-Agent": "Mozilla/5.0"
 }
 
-# 1ページ目のHTMLを parse_req.py の正規表現イメージで抽出
-ITEM_PATTERN = re.compile(
-    r'<a\s+class="items-grid_anchor_[^"]*"\s+href="([^"]*)"[^>]*?>'
-    r'.*?'
-    r'<p\s+class="items-grid_itemTitleText_[^"]*">([^<]*)</p>',
-    re.DOTALL
-)
+# 並列取得で同時に先読みするJSONページ数
+PAGE_WINDOW = 4
+
+
+def page1_url(category_id: str) -> str:
+    return f"{SITE}/categories/{category_id}"
+
+
+def json_page_url(category_id: str, page: int) -> str:
+    return f"{SITE}/load_items/categories/{category_id}/{page}?response_type=json"
+
 
+def fetch_page1_items(category_id: str, timeout: int = 20, engine=None) -> List[Dict[str, str]]:
+    engine = engine or get_fetch_engine()
+    return engine.run(lambda session, semaphore: _fetch_page1_items_async(session, category_id, semaphore, timeout))
 
-def fetch_page1_items(category_id: str, timeout: int = 20) -> List[Dict[str, str]]:
-    url = f"{SITE}/categories/{category_id}"
-    resp = requests.get(url, headers=HEADERS, timeout=timeout)
-    resp.raise_for_status()
-    html = resp.text
 
+def parse_page1_items(html: str) -> List[Dict[str, str]]:
+    """1ページ目のHTMLから商品タイトルとURLを取り出す。"""
     items = []
     seen = set()
 
-    for m in ITEM_PATTERN.finditer(html):
-        href = m.group(1)
-        title = (m.group(2) or "").strip()
-        full_url = urljoin(SITE, href)
+    for item in iter_items(html):
+        title = item["title"]
+        full_url = urljoin(SITE, item["url"])
 
         # URL重複で除外
         if "/items/" in full_url and full_url not in seen:
             items.append({"title": title, "url": full_url})
             seen.add(full_url)
 
-    # 念のためフォールバック（class名が変わった場合でも a[href^="/items/"] を拾う）
+    # 念のためフォールバック（マークアップ自体が変わった場合でも a[href^="/items/"] を拾う）
     if not items:
         try:
             # 簡易フォールバック: aタグとタイトル近傍をざっくり拾う
@@ -66,46 +76,158 @@ def fetch_page1_items(category_id: str, timeout: int = 20) -> List[Dict[str, str
     return items
 
 
-def fetch_more_pages(category_id: str, start_page: int = 2, sleep_sec: float = 0.7, timeout: int = 20) -> List[Dict[str, str]]:
+def fetch_more_pages(category_id: str, start_page: int = 2, sleep_sec: float = 0.7, timeout: int = 20,
+                     engine=None) -> List[Dict[str, str]]:
     """2ページ目以降は JSON API を n=2 から空/404まで。"""
-    results: List[Dict[str, str]] = []
-    page = start_page
-    tmpl = f"{SITE}/load_items/categories/{category_id}/{{page}}?response_type=json"
-
-    while True:
-        url = tmpl.format(page=page)
-        r = requests.get(url, headers=HEADERS, timeout=timeout)
-
-        if r.status_code == 404:
-            break  # そのページが無い
+    return list(iter_more_pages(category_id, start_page=start_page, sleep_sec=sleep_sec, timeout=timeout,
+                                engine=engine))
 
-        r.raise_for_status()
 
-        # 空や不正を安全に判定
-        data = None
-        try:
-            data = r.json()
-        except ValueError:
-            # JSONでない → 終了
-            break
+def iter_more_pages(category_id: str, start_page: int = 2, sleep_sec: float = 0.7,
+                    timeout: int = 20, engine=None) -> Iterator[Dict[str, str]]:
+    """fetch_more_pages と同じ順で、ページを取得するたびに商品を返す。"""
+    engine = engine or get_fetch_engine()
+    page = start_page
 
-        if not data:
-            break  # 空リスト or None → 終了
+    while True:
+        items = engine.run(
+            lambda session, semaphore: _fetch_json_page_async(session, category_id, page, semaphore, timeout)
+        )
+        if items is None:
+            break  # 404・空・JSONでない → 終了
 
-        for d in data:
-            title = (d.get("title") or "").strip()
-            href = d.get("url") or ""
-            full_url = urljoin(SITE, href)
-            if "/items/" in full_url:
-                results.append({"title": title, "url": full_url})
+        yield from items
 
         page += 1
         # 連続アクセスにならないよう控えめにスリープ
         time.sleep(sleep_sec)
 
+
+def parse_json_items(data) -> List[Dict[str, str]]:
+    """load_items の JSON から商品タイトルとURLを取り出す。"""
+    results: List[Dict[str, str]] = []
+    for d in data:
+        title = (d.get("title") or "").strip()
+        href = d.get("url") or ""
+        full_url = urljoin(SITE, href)
+        if "/items/" in full_url:
+            results.append({"title": title, "url": full_url})
     return results
 
 
+def parse_json_page(body: bytes) -> Optional[List[Dict[str, str]]]:
+    """load_items の応答本文から商品を取り出す。空やJSONでない場合は終端としてNone。"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not data:
+        return None
+    return parse_json_items(data)
+
+
+async def _fetch_page1_items_async(session: aiohttp.ClientSession, category_id: str,
+                                   semaphore: Optional[asyncio.Semaphore] = None,
+                                   timeout: int = 20) -> List[Dict[str, str]]:
+    resp = await fetch_page(session, page1_url(category_id), headers=HEADERS, semaphore=semaphore,
+                            timeout=aiohttp.ClientTimeout(total=timeout))
+    if resp.status != 200:
+        raise FetchError(f"HTTP {resp.status}")
+    return parse_page1_items(resp.text())
+
+
+async def _fetch_json_page_async(session: aiohttp.ClientSession, category_id: str, page: int,
+                                 semaphore: Optional[asyncio.Semaphore] = None,
+                                 timeout: int = 20) -> Optional[List[Dict[str, str]]]:
+    """JSONページを1つ取得する。404・空・JSONでない場合は終端としてNone。"""
+    resp = await fetch_page(session, json_page_url(category_id, page), headers=HEADERS, semaphore=semaphore,
+                            timeout=aiohttp.ClientTimeout(total=timeout))
+    if resp.status == 404:
+        return None
+    if resp.status != 200:
+        raise FetchError(f"HTTP {resp.status}")
+    return parse_json_page(resp.body)
+
+
+async def fetch_all_items_async(category_id: str, start_page: int = 2, window: int = PAGE_WINDOW,
+                                timeout: int = 20, session: Optional[aiohttp.ClientSession] = None,
+                                semaphore: Optional[asyncio.Semaphore] = None) -> List[Dict[str, str]]:
+    """
+    1ページ目のHTMLと2ページ目以降のJSONを並列に取得する。
+
+    JSONページは window 件先まで先読みし、404/空のページが見つかったら
+    それより後ろのページは取得をやめて結果も捨てる。
+    出力順と重複除外は fetch_page1_items + fetch_more_pages と同じ。
+    リクエスト間隔はホストごとのレート制限（utils.fetch_scheduler）に従い、
+    semaphore を渡すと在庫取得と同じ同時実行数の枠を使う。
+    session を省略すると、在庫取得と同じ設定のセッションをこの呼び出し用に作る。
+    """
+    if session is None:
+        async with create_session() as session:
+            return await fetch_all_items_async(category_id, start_page, window, timeout, session, semaphore)
+
+    window = max(1, window)
+    page1_task = asyncio.ensure_future(_fetch_page1_items_async(session, category_id, semaphore, timeout))
+    pages: Dict[int, List[Dict[str, str]]] = {}
+    tasks: Dict[asyncio.Future, int] = {}
+    end_page = None  # 最初に見つかった終端ページ
+    next_page = start_page
+
+    try:
+        while True:
+            # 終端が分かるまで、window 件を超えない範囲で先のページを投げておく
+            while len(tasks) < window and (end_page is None or next_page < end_page):
+                task = asyncio.ensure_future(
+                    _fetch_json_page_async(session, category_id, next_page, semaphore, timeout)
+                )
+                tasks[task] = next_page
+                next_page += 1
+            if not tasks:
+                break
+
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                page = tasks.pop(task)
+                items = task.result()
+                if items is None:
+                    if end_page is None or page < end_page:
+                        end_page = page
+                else:
+                    pages[page] = items
+
+            # 終端より後ろの先読みは取り消す
+            if end_page is not None:
+                for task, page in list(tasks.items()):
+                    if page > end_page:
+                        task.cancel()
+                        del tasks[task]
+
+        page1 = await page1_task
+    finally:
+        page1_task.cancel()
+        for task in tasks:
+            task.cancel()
+
+    more: List[Dict[str, str]] = []
+    for page in range(start_page, end_page):
+        more.extend(pages[page])
+    return dedup_keep_order(page1 + more)
+
+
+def fetch_all_items(category_id: str, start_page: int = 2, window: int = PAGE_WINDOW, timeout: int = 20,
+                    engine=None) -> List[Dict[str, str]]:
+    """
+    fetch_all_items_async を共有の取得エンジン（utils.fetch_engine）で実行する。
+
+    同じプロセスの在庫取得とセッション（接続プール）・同時実行数の枠・
+    ホストごとのレート制限を共有するので、同時に動いても合計が上限を超えない。
+    """
+    engine = engine or get_fetch_engine()
+    return engine.run(lambda session, semaphore: fetch_all_items_async(
+        category_id, start_page, window, timeout, session=session, semaphore=semaphore
+    ))
+
+
 def dedup_keep_order(rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
     seen = set()
     out: List[Dict[str, str]] = []
@@ -137,12 +259,19 @@ def main():
     parser.add_argument("--save", help="Save CSV to file (optional)")
     parser.add_argument("--timeout", type=int, default=20, help="HTTP timeout seconds (default: 20)")
     parser.add_argument("--sleep", type=float, default=0.7, help="Sleep seconds between JSON pages (default: 0.7)")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Fetch pages concurrently under the per-host rate limit instead of sleeping")
+    parser.add_argument("--window", type=int, default=PAGE_WINDOW,
+                        help=f"JSON pages to fetch ahead in --concurrent mode (default: {PAGE_WINDOW})")
     args = parser.parse_args()
 
     try:
-        page1 = fetch_page1_items(args.category, timeout=args.timeout)
-        more = fetch_more_pages(args.category, start_page=2, sleep_sec=args.sleep, timeout=args.timeout)
-        all_rows = dedup_keep_order(page1 + more)
+        if args.concurrent:
+            all_rows = fetch_all_items(args.category, window=args.window, timeout=args.timeout)
+        else:
+            page1 = fetch_page1_items(args.category, timeout=args.timeout)
+            more = fetch_more_pages(args.category, start_page=2, sleep_sec=args.sleep, timeout=args.timeout)
+            all_rows = dedup_keep_order(page1 + more)
 
         if args.save:
             save_csv(all_rows, args.save)
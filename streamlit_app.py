@@ -1,15 +1,12 @@
 import streamlit as st
-import asyncio
-import time
-from datetime import datetime
-import pytz
 
 # カスタムモジュールのインポート
 from styles.styles import load_css
-from utils.data_loader import parse_member_groups, create_member_url_map, create_member_group_map
-from utils.time_utils import sort_time_slots, is_after_final_slot_deadline, is_after_sale_start
-from utils.inventory import get_inventory_with_progress, calculate_sold_out_counts, calculate_member_sales_count
-from utils.ui_utils import generate_table_html, determine_crowded_time_slots
+from utils.data_loader import load_member_registry
+from utils.time_utils import EVENT_SCHEDULES, sort_time_slots
+from utils.inventory import calculate_sold_out_counts, calculate_member_sales_count
+from utils.snapshot import SnapshotStore
+from utils.ui_utils import generate_table_html, determine_crowded_time_slots, render_legend
 
 # ページの設定
 st.set_page_config(
@@ -21,81 +18,140 @@ st.set_page_config(
 # カスタムCSSを適用
 st.markdown(load_css(), unsafe_allow_html=True)
 
-# 日本時間のタイムゾーン設定
-jst = pytz.timezone('Asia/Tokyo')
-
 # アプリのヘッダー
 st.markdown('<div class="header"><h1>完売表</h1></div>', unsafe_allow_html=True)
 
-# セッション状態の初期化関数
-def initialize_session_state():
+@st.cache_resource
+def get_snapshot_store(event_id):
+    """
+    プロセス全体で共有する、イベントごとのスナップショットストアを返す
+    
+    取得用のイベントループ・接続プール・レート制限は全イベントで共有される。
+    """
+    return SnapshotStore(schedule=EVENT_SCHEDULES[event_id])
+
+def register_events():
+    """
+    全イベントの監視対象をストアに登録する（更新はバックグラウンドで行われる）
+    
+    表示していないイベントも更新し続けるので、切り替えたときはすぐに表示できる。
+    """
+    for event_id, schedule in EVENT_SCHEDULES.items():
+        registry = load_member_registry(schedule.members_csv)
+        member_names = [member["name"] for member in registry.member_groups["すべて"]]
+        get_snapshot_store(event_id).set_members(registry.url_map, member_names, registry.group_map)
+
+def render_partial_table(all_members, partial_data, member_urls, member_groups_map, crowded_threshold):
     """
-    セッション状態を初期化する
+    取得途中の在庫情報から、結果がそろったメンバーだけを埋めた表を作る
+    
+    Args:
+        all_members (list): 全メンバー情報リスト
+        partial_data (dict): 結果がそろったメンバー名と在庫情報のマッピング
+        member_urls (dict): メンバー名とURLのマップ
+        member_groups_map (dict): メンバー名からグループを取得するマップ
+        crowded_threshold (int): 混雑とみなす完売数
+        
+    Returns:
+        str: 生成されたHTMLテーブル
     """
-    if 'inventory_data_all' not in st.session_state:
-        st.session_state.inventory_data_all = {}
-        st.session_state.data_loaded = False
-        st.session_state.all_time_slots = set()
-        st.session_state.last_update_time = None
-        # メンバーURLを格納する辞書を初期化
-        st.session_state.member_urls = {}
-        st.session_state.using_final_slots = None  # 最終枠を使用するかどうかのフラグ
+    all_time_slots = set()
+    for member_data in partial_data.values():
+        all_time_slots.update(member_data.keys())
+    sorted_time_slots = sort_time_slots(all_time_slots)
+    
+    member_names = [member["name"] for member in all_members]
+    sold_out_counts = calculate_sold_out_counts(partial_data, sorted_time_slots)
+    return generate_table_html(
+        all_members,
+        sorted_time_slots,
+        partial_data,
+        member_urls,
+        member_groups_map,
+        sold_out_counts,
+        determine_crowded_time_slots(sorted_time_slots, sold_out_counts, crowded_threshold),
+        calculate_member_sales_count(member_names, partial_data),
+        pending_members={name for name in member_names if name not in partial_data}
+    )
+
+def render_debug_panel(snapshot):
+    """
+    更新ごとの計測レポートと集計を表示する（URLに ?debug=1 を付けたときだけ）
+    
+    Args:
+        snapshot (InventorySnapshot): 最新のスナップショット
+    """
+    data = snapshot.report.to_dict()
+    with st.expander("デバッグ: 取得の計測", expanded=True):
+        st.write(
+            f"所要時間: {data['duration'] or 0:.2f}秒 / リクエスト: {data['requests']}件 / "
+            f"受信: {data['bytes'] / 1024:.0f}KB / 再試行: {data['retries']}回"
+        )
+        st.json(data["counters"])
+        st.markdown("フェーズごとの所要時間（秒）")
+        st.table(data["percentiles"])
+        st.markdown("遅かったURL")
+        st.dataframe(data["slowest"])
+        st.write(f"前回からの変化: {len(snapshot.changes)}セル")
+        st.markdown("グループごとの売上数")
+        st.json(snapshot.aggregates.group_sales_count())
 
 def main():
     """
     アプリケーションのメイン関数
     """
-    # セッション状態の初期化
-    initialize_session_state()
+    # 全イベントの監視対象を共有ストアに登録
+    register_events()
     
-    # メンバーグループデータを取得 (member.txt から)
-    member_groups = parse_member_groups()
-    
-    # メンバー名とURLの辞書を作成
-    member_urls = create_member_url_map(member_groups)
+    # 表示するイベントを選ぶ（1つだけなら選択欄は出さない）
+    event_ids = list(EVENT_SCHEDULES)
+    event_id = event_ids[0]
+    if len(event_ids) > 1:
+        event_id = st.selectbox(
+            label="イベント選択",
+            options=event_ids,
+            format_func=lambda key: EVENT_SCHEDULES[key].name or key,
+            label_visibility="collapsed",
+            key="event_filter"
+        )
+    schedule = EVENT_SCHEDULES[event_id]
     
-    # セッション状態に保存
-    st.session_state.member_urls = member_urls
+    # メンバーグループデータを取得 (members.csv から。変更がなければ前回読み込んだものを使う)
+    registry = load_member_registry(schedule.members_csv)
+    member_groups = registry.member_groups
+    member_urls = registry.url_map
+    member_groups_map = registry.group_map
     
-    # 最終枠を使用するかどうかを確認
-    using_final_slots = not is_after_final_slot_deadline()
+    # すべてのメンバー
+    all_members = member_groups["すべて"]
     
-    # 進捗状況表示用のプレースホルダー
-    progress_placeholder = st.empty()
-    status_placeholder = st.empty()
+    store = get_snapshot_store(event_id)
+    snapshot = store.get()
     
-    # 最初のロード時のみデータを取得、または最終枠の使用状態が変わった場合も再取得
-    if not st.session_state.data_loaded or st.session_state.using_final_slots != using_final_slots:
+    # 最初の取得が終わるまでは、そろったメンバーから順に表を埋めていく
+    if snapshot is None:
+        progress_placeholder = st.empty()
+        status_placeholder = st.empty()
+        table_placeholder = st.empty()
         progress_bar = progress_placeholder.progress(0)
-        status_text = status_placeholder.empty()
-        
-        # 最終枠の使用状態を保存
-        st.session_state.using_final_slots = using_final_slots
-        
-        # すべてのメンバーのメンバー名を取得
-        all_members = member_groups["すべて"]
-        member_names = [member["name"] for member in all_members]
-        
-        # 非同期処理で在庫状況を取得（進捗表示付き）
-        inventory_data = asyncio.run(get_inventory_with_progress(member_urls, member_names, progress_bar, status_text))
-        
-        # セッション状態に保存
-        st.session_state.inventory_data_all = inventory_data
-        
-        # 全ての時間帯を収集してセッション状態に保存
-        all_time_slots = set()
-        for member_data in inventory_data.values():
-            all_time_slots.update(member_data.keys())
-        st.session_state.all_time_slots = all_time_slots
-        
-        # 最終更新時間を保存
-        st.session_state.last_update_time = datetime.now(jst).strftime("%Y-%m-%d %H:%M:%S")
-        st.session_state.data_loaded = True
-        
-        # 少し待機してから進捗表示を消す
-        time.sleep(0.1)
+        rendered_count = -1
+        while snapshot is None:
+            progress = store.progress
+            progress_bar.progress(min(progress.fraction, 1.0))
+            status_placeholder.info(progress.message or "在庫情報を取得中です...")
+            
+            partial_data = store.get_partial()
+            if len(partial_data) != rendered_count:
+                rendered_count = len(partial_data)
+                table_placeholder.markdown(
+                    render_partial_table(all_members, partial_data, member_urls, member_groups_map,
+                                         schedule.crowded_threshold),
+                    unsafe_allow_html=True
+                )
+            snapshot = store.wait_for_snapshot(timeout=0.2)
         progress_placeholder.empty()
         status_placeholder.empty()
+        table_placeholder.empty()
     
     # フィルターUI
     st.markdown('<div class="filter-label">グループで絞り込む:</div>', unsafe_allow_html=True)
@@ -104,7 +160,7 @@ def main():
         options=list(member_groups.keys()),
         index=0,
         label_visibility="collapsed",
-        key="group_filter"
+        key=f"group_filter_{event_id}"
     )
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -113,69 +169,59 @@ def main():
     
     if filtered_members:
         # 更新時間を表示
-        st.markdown(f'<div class="update-time">最終更新: {st.session_state.last_update_time}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="update-time">最終更新: {snapshot.last_update_time}</div>', unsafe_allow_html=True)
         
-        # 時間帯をソート
-        sorted_time_slots = sort_time_slots(st.session_state.all_time_slots)
+        # 時間帯（スナップショット作成時に並べ替え済み）
+        sorted_time_slots = snapshot.matrix.slots
         
         # マトリクス表を作成
         st.markdown('<div class="time-container">', unsafe_allow_html=True)
         
         # 凡例の表示
-        st.markdown("""
-        <div class="footnote" style="margin-bottom: 15px;">
-            <span class="legend-item"><span style="color: #fd7e14; font-weight: bold;">オレンジ</span> : 混雑(15人以上)</span>
-            <span class="legend-item"><span style="color: #6c757d;">🔒</span> : 未解放</span>
-            <span class="legend-item"><span style="color: #dc3545;">×</span> : 完売</span>
-            <span class="legend-item"><span style="color: #198754;">⚪︎</span> : 購入可能</span>
-        </div>""", unsafe_allow_html=True)
+        st.markdown(render_legend(schedule.crowded_threshold), unsafe_allow_html=True)
         
         # フィルター用のメンバー名リスト
         filtered_member_names = [member["name"] for member in filtered_members]
         
         # フィルタリングされたインベントリデータ
         filtered_inventory_data = {
-            name: st.session_state.inventory_data_all.get(name, {}) 
+            name: snapshot.inventory_data.get(name, {}) 
             for name in filtered_member_names
         }
         
-        # メンバー名からグループを取得するための辞書を作成
-        member_groups_map = create_member_group_map(member_groups)
+        # 完売数・混雑・売上数は更新時に差分で集計済みのものを読むだけ
+        aggregates = snapshot.aggregates
         
-        # 時間帯ごとの完売数をカウント
-        sold_out_counts = calculate_sold_out_counts(
-            st.session_state.inventory_data_all, 
-            sorted_time_slots
-        )
+        # 時間帯ごとの完売数
+        sold_out_counts = aggregates.sold_out_counts(sorted_time_slots)
 
         # 混雑時間帯の判定
-        crowded_time_slots = determine_crowded_time_slots(
-            sorted_time_slots, 
-            sold_out_counts
-        )
+        crowded_time_slots = aggregates.crowded_time_slots(sorted_time_slots, schedule.crowded_threshold)
 
-        # メンバーごとの売上数を計算
-        member_sales_count = calculate_member_sales_count(
-            filtered_member_names, 
-            st.session_state.inventory_data_all
-        )
+        # メンバーごとの売上数
+        member_sales_count = aggregates.member_sales_count(filtered_member_names)
 
         # HTMLテーブルを生成して表示
         table_html = generate_table_html(
             filtered_members, 
             sorted_time_slots,
-            st.session_state.inventory_data_all, 
-            st.session_state.member_urls, 
+            snapshot.inventory_data, 
+            member_urls, 
             member_groups_map, 
             sold_out_counts, 
             crowded_time_slots, 
-            member_sales_count
+            member_sales_count,
+            snapshot.fetch_counters.stale_members if snapshot.fetch_counters else None
         )
         
         st.markdown(table_html, unsafe_allow_html=True)
         st.markdown('</div>', unsafe_allow_html=True)
     else:
         st.warning(f"選択されたグループ '{selected_group}' にはメンバーがいません。")
+    
+    # デバッグ表示
+    if st.query_params.get("debug") == "1" and snapshot.report is not None:
+        render_debug_panel(snapshot)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
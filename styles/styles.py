@@ -94,6 +94,7 @@ def load_css():
     .sold-out { color: #dc3545; }
     .last-one { color: #198754; }
     .locked { color: #6c757d; font-size: 18px; }  /* 統一したフォントサイズ */
+    .pending { color: #ced4da; }  /* 取得待ち */
     
     /* ラベル */
     .crowded-label { color: #fd7e14; font-weight: bold; }
@@ -146,6 +147,14 @@ def load_css():
         text-decoration: underline;
     }
     
+    /* 取得に失敗して前回の情報を表示しているメンバー */
+    .stale-marker {
+        color: #ffc107;
+        font-size: 12px;
+        margin-left: 2px;
+        cursor: help;
+    }
+    
     /* ヘッダー */
     .header {
         text-align: center;
@@ -0,0 +1,111 @@
+"""
+カテゴリページのHTMLから商品のタイトルとURLを抽出するモジュール
+
+BASEの商品一覧は `items-grid_anchor_<ハッシュ>` のaタグの中に
+`items-grid_itemTitleText_<ハッシュ>` のpタグでタイトルを持つ。ハッシュ部分は
+サイトの更新で変わるので、クラス名は前方一致で判定する。
+
+文書全体を読み込まず、ストリームから少しずつ読みながら商品を順に返す。
+"""
+import codecs
+import re
+from html import unescape
+
+
+# 商品のaタグとタイトルのpタグのクラス名（後ろにCSSのハッシュが付く）
+ANCHOR_CLASS_PREFIX = "items-grid_anchor_"
+TITLE_CLASS_PREFIX = "items-grid_itemTitleText_"
+
+# ストリームから一度に読み込むサイズ
+READ_SIZE = 64 * 1024
+
+
+def _class_attribute(prefix, quote):
+    """
+    prefix で始まるクラスを含む class 属性にマッチする正規表現
+    （quote は引用符を受ける名前付きグループの名前）
+    """
+    return (
+        r'class\s*=\s*(?P<' + quote + r'>["\'])(?:[^"\']*\s)?' + re.escape(prefix)
+        + r'[\w-]*(?:\s[^"\']*)?(?P=' + quote + r')'
+    )
+
+
+# 商品のaタグ、またはタイトルのpタグ（テキストまで）にマッチする
+_TOKEN = re.compile(
+    r'(?P<anchor><a\s[^>]*?' + _class_attribute(ANCHOR_CLASS_PREFIX, "aq") + r'[^>]*>)'
+    r'|<p\s[^>]*?' + _class_attribute(TITLE_CLASS_PREFIX, "pq") + r'[^>]*>(?P<title>[^<]*)</p\s*>'
+)
+_HREF = re.compile(r'\shref\s*=\s*(["\'])(.*?)\1', re.DOTALL)
+
+
+def _chunks(source):
+    """
+    bytes・str・ファイルオブジェクト・チャンクのイテラブルを str のチャンクにする
+    """
+    if isinstance(source, str):
+        yield source
+        return
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        yield bytes(source).decode("utf-8", errors="replace")
+        return
+
+    if hasattr(source, "read"):
+        def raw_chunks():
+            while True:
+                chunk = source.read(READ_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+        raw = raw_chunks()
+    else:
+        raw = iter(source)
+
+    # マルチバイト文字がチャンクの境目で切れても正しく復号する
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in raw:
+        yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _pending_start(buffer, start):
+    """
+    バッファ末尾の、まだ閉じていない可能性があるタグの開始位置
+
+    商品のaタグは中に '<' を含まず、タイトルは '<p ...>テキスト</p>' なので、
+    最後から2つ目の '<' から残せば途中で切れた分を失わない。
+    """
+    pos = buffer.rfind("<", start)
+    if pos > start:
+        previous = buffer.rfind("<", start, pos)
+        if previous != -1:
+            return previous
+    return pos
+
+
+def iter_items(bytes_or_stream):
+    """
+    カテゴリページの商品を出現順に返す
+
+    Args:
+        bytes_or_stream: HTML（bytes・str）、read() を持つファイルオブジェクト、
+            またはチャンクのイテラブル（requests の iter_content など）
+
+    Yields:
+        dict: {"title": タイトル, "url": aタグのhref（相対URLのまま）}
+    """
+    buffer = ""
+    href = None
+    for chunk in _chunks(bytes_or_stream):
+        buffer += chunk
+        end = 0
+        for m in _TOKEN.finditer(buffer):
+            end = m.end()
+            if m.group("anchor") is not None:
+                found = _HREF.search(m.group("anchor"))
+                href = unescape(found.group(2)) if found else None
+            elif href is not None:
+                yield {"title": unescape(m.group("title")).strip(), "url": href}
+                href = None
+        pending = _pending_start(buffer, end)
+        buffer = buffer[pending:] if pending != -1 else ""
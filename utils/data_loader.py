@@ -1,7 +1,15 @@
 """
 メンバーデータの読み込みと処理を行うモジュール
 """
+import csv
+import hashlib
+import io
+import os
 import re
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+from types import MappingProxyType
 
 
 def format_member_name(name):
@@ -36,65 +44,150 @@ def format_member_name(name):
     return name
 
 
-def parse_member_groups():
+@dataclass(frozen=True)
+class MemberRegistry:
     """
-    members.csv からメンバー情報を読み込んで、グループごとに格納する
+    members.csv から作ったメンバー情報（読み取り専用）
+    
+    Attributes:
+        member_groups (Mapping): グループ名 → メンバー情報のタプル（"すべて" を含む）
+        url_map (Mapping): メンバー名 → {"normal": 通常枠URL, "final": 最終枠URL}
+        group_map (Mapping): メンバー名 → グループ名
+        member_index (Mapping): メンバー名 → CSV上の順番
+        mtime (float): 読み込んだときのファイルの更新時刻
+        digest (str): 読み込んだときのファイル内容のハッシュ
+    """
+    member_groups: Mapping
+    url_map: Mapping
+    group_map: Mapping
+    member_index: Mapping
+    mtime: float = 0.0
+    digest: str = ""
+
+
+MEMBERS_CSV = 'members.csv'
+
+# CSVのパス → MemberRegistry
+_registries = {}
+_registry_lock = threading.Lock()
+
+
+def _build_registry(content, mtime, digest):
+    """
+    CSVの内容から MemberRegistry を作る
     CSVの形式:
     1hour,15min,name,group
-    
-    Returns:
-        dict: グループ名をキー、メンバー情報リストを値とする辞書
     """
     # グループ構造の初期化（すべてグループは維持）
     member_groups = {
         "すべて": []
     }
     
-    try:
-        # CSVファイルを直接読み込む
-        with open('members.csv', 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+    reader = csv.reader(io.StringIO(content))
+    # ヘッダー行をスキップ (最初の行)
+    next(reader, None)
+    
+    for parts in reader:
+        if not parts or not any(part.strip() for part in parts):
+            continue
         
-        # ヘッダー行をスキップ (最初の行)
-        for line in lines[1:]:
-            if not line.strip():
-                continue
-                
-            # カンマで分割
-            parts = line.strip().split(',')
+        if len(parts) >= 4:
+            name = parts[2]
+            group = parts[3]
+            
+            # URL情報を取得（現在のCSVフォーマットは1hour,15min,name,group）
+            final_url = parts[0] if parts[0].strip() else None  # 1hour URL (最終枠)
+            normal_url = parts[1] if parts[1].strip() else None  # 15min URL (通常枠)
+            
+            # メンバー情報を作成
+            member_info = {
+                "normal_url": normal_url,
+                "final_url": final_url,
+                "name": name
+            }
+            
+            # グループが存在しない場合は新規作成
+            if group not in member_groups:
+                member_groups[group] = []
             
-            if len(parts) >= 4:
-                name = parts[2]
-                group = parts[3]
-                
-                # URL情報を取得（現在のCSVフォーマットは1hour,15min,name,group）
-                final_url = parts[0] if parts[0].strip() else None  # 1hour URL (最終枠)
-                normal_url = parts[1] if parts[1].strip() else None  # 15min URL (通常枠)
-                
-                # メンバー情報を作成
-                member_info = {
-                    "normal_url": normal_url,
-                    "final_url": final_url,
-                    "name": name
-                }
-                
-                # グループが存在しない場合は新規作成
-                if group not in member_groups:
-                    member_groups[group] = []
-                
-                # グループごとのリストに追加
-                member_groups[group].append(member_info)
-                member_groups["すべて"].append(member_info)
+            # グループごとのリストに追加
+            member_groups[group].append(member_info)
+            member_groups["すべて"].append(member_info)
+        else:
+            print(f"メンバーデータが不正: {','.join(parts)}")
+    
+    url_map = {}
+    group_map = {}
+    member_index = {}
+    for group_name, members in member_groups.items():
+        for member in members:
+            url_map[member["name"]] = {
+                "normal": member["normal_url"],
+                "final": member["final_url"]
+            }
+            if group_name != "すべて":  # "すべて"は実際のグループではないのでスキップ
+                group_map[member["name"]] = group_name
+    for index, member in enumerate(member_groups["すべて"]):
+        member_index.setdefault(member["name"], index)
+    
+    return MemberRegistry(
+        member_groups=MappingProxyType({k: tuple(v) for k, v in member_groups.items()}),
+        url_map=MappingProxyType(url_map),
+        group_map=MappingProxyType(group_map),
+        member_index=MappingProxyType(member_index),
+        mtime=mtime,
+        digest=digest,
+    )
+
+
+def load_member_registry(path=None):
+    """
+    members.csv の MemberRegistry を返す
+    
+    ファイルごとにプロセス内で1度だけ読み込み、ファイルの更新時刻が変わったときだけ
+    内容のハッシュを確認して、変わっていれば読み直す。
+    
+    Args:
+        path (str): CSVファイルのパス（省略時は members.csv）
+        
+    Returns:
+        MemberRegistry: メンバー情報
+    """
+    path = path or MEMBERS_CSV
+    
+    with _registry_lock:
+        registry = _registries.get(path)
+        try:
+            mtime = os.stat(path).st_mtime
+            if registry is not None and registry.mtime == mtime:
+                return registry
+            
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha1(raw).hexdigest()
+            if registry is not None and registry.digest == digest:
+                registry = replace(registry, mtime=mtime)
             else:
-                print(f"メンバーデータが不正: {line}")
-                continue
+                registry = _build_registry(raw.decode('utf-8'), mtime, digest)
+            _registries[path] = registry
+            return registry
         
-        return member_groups
+        except Exception as e:
+            print(f"{path}の読み込み中にエラーが発生しました: {e}")
+            # エラー時は前回読み込めた内容、なければ空のメンバー情報を返す
+            if registry is not None:
+                return registry
+            return _build_registry("", 0.0, "")
+
+
+def parse_member_groups():
+    """
+    members.csv からメンバー情報を読み込んで、グループごとに格納する
     
-    except Exception as e:
-        print(f"member.csvの読み込み中にエラーが発生しました: {e}")
-        # エラー時は空の辞書を返す
-        return {key: [] for key in member_groups.keys()}
+    Returns:
+        Mapping: グループ名をキー、メンバー情報のタプルを値とする辞書
+    """
+    return load_member_registry().member_groups
 
 
 def create_member_url_map(member_groups):
@@ -107,6 +200,10 @@ def create_member_url_map(member_groups):
     Returns:
         dict: メンバー名をキー、URLの辞書を値とする辞書
     """
+    registry = load_member_registry()
+    if member_groups is registry.member_groups:
+        return registry.url_map
+    
     member_urls = {}
     for member_list in member_groups.values():
         for member in member_list:
@@ -128,10 +225,14 @@ def create_member_group_map(member_groups):
     Returns:
         dict: メンバー名をキー、グループ名を値とする辞書
     """
+    registry = load_member_registry()
+    if member_groups is registry.member_groups:
+        return registry.group_map
+    
     member_groups_map = {}
     for group_name, members in member_groups.items():
         if group_name != "すべて":  # "すべて"は実際のグループではないのでスキップ
             for member in members:
                 member_groups_map[member["name"]] = group_name
     
-    return member_groups_map
\ No newline at end of file
+    return member_groups_map
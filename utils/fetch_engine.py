@@ -0,0 +1,97 @@
+"""
+複数のイベントの在庫取得で共有する取得エンジン
+
+イベントごとに接続プールやイベントループを持たず、プロセスに1つの
+イベントループ・セッション・同時実行数の枠をすべての取得で使い回す。
+ホストごとのレート制限（fetch_scheduler のトークンバケット）もプロセス全体で共有される。
+"""
+import asyncio
+import atexit
+import threading
+
+from utils.fetch_scheduler import FETCH_CONCURRENCY
+from utils.http_client import create_session
+
+
+class FetchEngine:
+    """
+    専用スレッドのイベントループで取得処理を実行する
+    """
+
+    def __init__(self, concurrency=None):
+        """
+        Args:
+            concurrency (int): 全イベント合計の同時実行数（省略時は FETCH_CONCURRENCY）
+        """
+        self.concurrency = concurrency or FETCH_CONCURRENCY
+        self._loop = None
+        self._thread = None
+        self._session = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="fetch-engine", daemon=True)
+            self._thread.start()
+
+    async def _call(self, fetch):
+        # セッションと枠はイベントループの中で作る
+        if self._session is None or self._session.closed:
+            self._session = create_session()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return await fetch(self._session, self._semaphore)
+
+    def run(self, fetch):
+        """
+        取得処理を共有のイベントループで実行し、終わるまで待つ
+
+        Args:
+            fetch (callable): (session, semaphore) を受け取るコルーチン関数
+
+        Returns:
+            fetch の戻り値
+        """
+        self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._call(fetch), self._loop).result()
+
+    async def _close_session(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def close(self):
+        """
+        セッションを閉じてイベントループを止める（再び run すると作り直す）
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        asyncio.run_coroutine_threadsafe(self._close_session(), loop).result()
+        self._semaphore = None
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_fetch_engine():
+    """
+    プロセスで共有する FetchEngine を返す
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = FetchEngine()
+            # 終了時に接続を閉じる
+            atexit.register(_engine.close)
+        return _engine
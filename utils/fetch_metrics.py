@@ -0,0 +1,297 @@
+"""
+在庫取得のリクエストごとの計測と、更新ごとのレポートをまとめるモジュール
+
+DNS・接続・最初の1バイトまで（TTFB）・本文の受信・解析の各時間と、
+ステータス・受信バイト数・再試行回数をURLごとに記録する。
+レポートはStreamlitのデバッグ表示と、JSON / Prometheus形式のエンドポイントで見られる。
+"""
+import json
+import math
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import aiohttp
+
+
+@dataclass
+class RequestTiming:
+    """
+    1つのURLの取得にかかった時間などの記録（時間は秒）
+
+    Attributes:
+        url (str): 取得したURL
+        status (int): 最後の応答のHTTPステータス（応答がなければ0）
+        bytes (int): 受信した本文のバイト数
+        retries (int): 再試行した回数
+        dns (float): 名前解決の時間
+        connect (float): 接続確立の時間
+        ttfb (float): リクエスト送信から応答ヘッダー受信まで（名前解決・接続を除く）
+        download (float): 本文の受信時間
+        parse (float): ハッシュ計算と解析の時間
+        total (float): 再試行を含む全体の時間
+        outcome (str): "parsed" / "unchanged" / "not_modified" / "failed"
+            / "fallback"（JSONで取得できずHTMLで取り直した）
+    """
+    url: str
+    status: int = 0
+    bytes: int = 0
+    retries: int = 0
+    dns: float = 0.0
+    connect: float = 0.0
+    ttfb: float = 0.0
+    download: float = 0.0
+    parse: float = 0.0
+    total: float = 0.0
+    outcome: str = ""
+    _request_start: float = field(default=0.0, repr=False)
+    _phase_start: float = field(default=0.0, repr=False)
+
+
+PHASES = ("dns", "connect", "ttfb", "download", "parse", "total")
+
+# inventory_refresh_pages{result=...} ではなく単独で出す FetchCounters の項目
+_COUNTER_METRICS = {
+    "json_pages": "inventory_refresh_json_pages",
+    "bytes_saved": "inventory_refresh_saved_bytes",
+    "seconds_saved": "inventory_refresh_saved_seconds",
+}
+
+
+def create_trace_config():
+    """
+    session.get(..., trace_request_ctx=RequestTiming) で渡した記録に
+    名前解決・接続・TTFBの時間を書き込む TraceConfig を作る
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    def timing_of(context):
+        timing = context.trace_request_ctx
+        return timing if isinstance(timing, RequestTiming) else None
+
+    async def on_request_start(session, context, params):
+        timing = timing_of(context)
+        if timing:
+            timing._request_start = time.perf_counter()
+
+    async def on_phase_start(session, context, params):
+        timing = timing_of(context)
+        if timing:
+            timing._phase_start = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        timing = timing_of(context)
+        if timing:
+            timing.dns += time.perf_counter() - timing._phase_start
+
+    async def on_connect_end(session, context, params):
+        timing = timing_of(context)
+        if timing:
+            timing.connect += time.perf_counter() - timing._phase_start
+
+    async def on_request_end(session, context, params):
+        timing = timing_of(context)
+        if timing:
+            elapsed = time.perf_counter() - timing._request_start
+            timing.ttfb = max(0.0, elapsed - timing.dns - timing.connect)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_dns_resolvehost_start.append(on_phase_start)
+    trace_config.on_dns_resolvehost_end.append(on_dns_end)
+    trace_config.on_connection_create_start.append(on_phase_start)
+    trace_config.on_connection_create_end.append(on_connect_end)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+def percentile(values, q):
+    """
+    最近傍順位法によるパーセンタイル（valuesはソート済み）
+    """
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+class RefreshReport:
+    """
+    1回の更新でのリクエストごとの記録をまとめる
+    """
+
+    def __init__(self, counters=None):
+        """
+        Args:
+            counters (FetchCounters): 同じ更新の取得結果の内訳（レポートに含める）
+        """
+        self.counters = counters
+        self.timings = []
+        self.url_members = {}
+        self.queue_waits = {}
+        self.started_at = time.time()
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, timing):
+        with self._lock:
+            self.timings.append(timing)
+
+    def record_queue_wait(self, url, seconds):
+        """
+        並列数・レート制限による順番待ちの時間を記録する
+        """
+        with self._lock:
+            self.queue_waits[url] = seconds
+
+    def finish(self):
+        self.finished_at = time.time()
+
+    def phase_percentiles(self):
+        """
+        フェーズごとの p50 / p95 / p99（秒）
+        """
+        with self._lock:
+            timings = list(self.timings)
+        result = {}
+        for phase in PHASES:
+            values = sorted(getattr(t, phase) for t in timings)
+            result[phase] = {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+        with self._lock:
+            waits = sorted(self.queue_waits.values())
+        result["queue"] = {f"p{q}": percentile(waits, q) for q in (50, 95, 99)}
+        return result
+
+    def slowest(self, n=10):
+        """
+        全体の時間が長かった順に n 件（メンバー名付き）
+        """
+        with self._lock:
+            timings = sorted(self.timings, key=lambda t: t.total, reverse=True)[:n]
+        return [
+            {"member": self.url_members.get(t.url, ""), "queue": self.queue_waits.get(t.url, 0.0),
+             **_public_fields(t)}
+            for t in timings
+        ]
+
+    def to_dict(self):
+        """
+        JSONで出力できる辞書にする
+        """
+        with self._lock:
+            timings = list(self.timings)
+        counters = self.counters
+        return {
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": (self.finished_at - self.started_at) if self.finished_at else None,
+            "requests": len(timings),
+            "bytes": sum(t.bytes for t in timings),
+            "retries": sum(t.retries for t in timings),
+            "counters": {
+                k: v for k, v in asdict(counters).items() if k != "stale_members"
+            } if counters else {},
+            "stale_members": sorted(counters.stale_members) if counters else [],
+            "percentiles": self.phase_percentiles(),
+            "slowest": self.slowest(),
+        }
+
+    def prometheus_samples(self):
+        """
+        Prometheus の (メトリクス名, ラベル, 値) の一覧
+        """
+        data = self.to_dict()
+        samples = [
+            ("inventory_refresh_duration_seconds", {}, data["duration"] or 0),
+            ("inventory_refresh_requests", {}, data["requests"]),
+            ("inventory_refresh_bytes", {}, data["bytes"]),
+            ("inventory_refresh_retries", {}, data["retries"]),
+        ]
+        for name, value in data["counters"].items():
+            if name in _COUNTER_METRICS:
+                # ページ数ではない値（節約量など）は別のメトリクスにする
+                samples.append((_COUNTER_METRICS[name], {}, value))
+            else:
+                samples.append(("inventory_refresh_pages", {"result": name}, value))
+        for phase, values in data["percentiles"].items():
+            for q, value in values.items():
+                quantile = int(q[1:]) / 100
+                samples.append(("inventory_fetch_phase_seconds", {"phase": phase, "quantile": quantile},
+                                f"{value:.6f}"))
+        return samples
+
+    def to_prometheus(self):
+        """
+        Prometheusのテキスト形式にする
+        """
+        return reports_to_prometheus({"": self})
+
+
+def reports_to_prometheus(reports):
+    """
+    イベントごとのレポートをまとめてPrometheusのテキスト形式にする
+
+    Args:
+        reports (dict): イベントID → RefreshReport（IDが空ならevent ラベルを付けない）
+    """
+    families = {}
+    for event_id, report in reports.items():
+        for name, labels, value in report.prometheus_samples():
+            if event_id:
+                labels = {"event": event_id, **labels}
+            families.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, samples in families.items():
+        lines.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _public_fields(timing):
+    return {k: v for k, v in asdict(timing).items() if not k.startswith("_")}
+
+
+def start_metrics_server(port, get_reports, host="0.0.0.0"):
+    """
+    最新のレポートを返すHTTPサーバーを別スレッドで起動する
+
+    /metrics でPrometheus形式（event ラベル付き）、/report.json でイベントIDごとのJSONを返す。
+
+    Args:
+        port (int): 待ち受けるポート
+        get_reports (callable): イベントID → 最新の RefreshReport の辞書を返す関数
+        host (str): 待ち受けるアドレス
+
+    Returns:
+        ThreadingHTTPServer: 起動したサーバー
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            reports = get_reports()
+            if self.path == "/metrics":
+                body = reports_to_prometheus(reports) if reports else ""
+                content_type = "text/plain; version=0.0.4"
+            elif self.path == "/report.json":
+                body = json.dumps({event_id: report.to_dict() for event_id, report in reports.items()},
+                                  ensure_ascii=False)
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            payload = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    return server
@@ -0,0 +1,179 @@
+"""
+URL取得の並列数とホストごとのリクエストレートを制御するモジュール
+
+固定サイズのチャンクごとに待つのではなく、常に最大N件を実行中に保ち、
+ホストごとのトークンバケットでリクエスト間隔を空ける。
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+
+# 同時に実行するリクエスト数
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "15"))
+
+# ホストごとのリクエストレート（毎秒）とバースト数
+FETCH_RATE_PER_SEC = float(os.environ.get("FETCH_RATE_PER_SEC", "20"))
+FETCH_BURST = int(os.environ.get("FETCH_BURST", "15"))
+
+# ホスト個別の設定（レート, バースト）
+HOST_RATE_LIMITS = {
+    "zeroproz2a.base.shop": (FETCH_RATE_PER_SEC, FETCH_BURST),
+}
+
+
+class TokenBucket:
+    """
+    トークンバケットによるレート制限
+
+    スレッドセーフで、イベントループに依存しないため、
+    別スレッドの asyncio.run から同時に使っても全体のレートを守る。
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): 1秒あたりに補充されるトークン数
+            burst (int): 貯められるトークンの上限
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        トークンを1つ予約し、使えるようになるまでの待ち秒数を返す
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    async def acquire(self):
+        """
+        トークンが使えるようになるまで待つ
+        """
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+_host_buckets = {}
+_host_buckets_lock = threading.Lock()
+
+
+def get_host_bucket(host):
+    """
+    ホストごとのトークンバケットを返す（プロセス内で共有）
+    """
+    with _host_buckets_lock:
+        bucket = _host_buckets.get(host)
+        if bucket is None:
+            rate, burst = HOST_RATE_LIMITS.get(host, (FETCH_RATE_PER_SEC, FETCH_BURST))
+            bucket = TokenBucket(rate, burst)
+            _host_buckets[host] = bucket
+        return bucket
+
+
+async def acquire_host_slot(url):
+    """
+    URLのホストに対するレート制限を待つ
+    """
+    if not url:
+        return
+    host = urlparse(url).hostname
+    if host:
+        await get_host_bucket(host).acquire()
+
+
+# FetchScheduler の中で実行中のタスクが保持している同時実行数の枠
+_held_semaphore = contextvars.ContextVar("held_semaphore", default=None)
+
+
+async def retry_sleep(delay):
+    """
+    再試行まで待つ
+
+    FetchScheduler の中から呼ばれた場合は、待つ間だけ同時実行数の枠を手放し、
+    他のURLの取得を止めないようにする。
+    """
+    semaphore = _held_semaphore.get()
+    if semaphore is None:
+        await asyncio.sleep(delay)
+        return
+    semaphore.release()
+    try:
+        await asyncio.sleep(delay)
+    finally:
+        await semaphore.acquire()
+
+
+class FetchScheduler:
+    """
+    スライディングウィンドウ方式でURLを取得する
+    """
+
+    def __init__(self, concurrency=None, report=None, semaphore=None):
+        """
+        Args:
+            concurrency (int): 同時実行数（省略時は FETCH_CONCURRENCY）
+            report (RefreshReport): 順番待ちの時間を記録する（省略可）
+            semaphore (asyncio.Semaphore): 他の取得と共有する同時実行数の枠
+                （指定すると concurrency は使わない）
+        """
+        self.concurrency = concurrency or FETCH_CONCURRENCY
+        self.report = report
+        self.semaphore = semaphore
+
+    async def _run_one(self, semaphore, index, url, fetch):
+        queued = time.perf_counter()
+        async with semaphore:
+            await acquire_host_slot(url)
+            if self.report is not None:
+                self.report.record_queue_wait(url, time.perf_counter() - queued)
+            token = _held_semaphore.set(semaphore)
+            try:
+                return index, await fetch(url)
+            finally:
+                _held_semaphore.reset(token)
+
+    async def as_completed(self, urls, fetch):
+        """
+        取得が終わった順に (インデックス, 結果) を返す
+
+        Args:
+            urls (list): 取得するURLのリスト
+            fetch (callable): URLを受け取り結果を返すコルーチン関数
+
+        Yields:
+            tuple: urls内のインデックスと fetch の結果
+        """
+        semaphore = self.semaphore or asyncio.Semaphore(self.concurrency)
+        tasks = [
+            asyncio.ensure_future(self._run_one(semaphore, index, url, fetch))
+            for index, url in enumerate(urls)
+        ]
+        try:
+            for future in asyncio.as_completed(tasks):
+                yield await future
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def gather(self, urls, fetch):
+        """
+        全URLを取得し、urlsと同じ順序で結果を返す
+        """
+        results = [None] * len(urls)
+        async for index, result in self.as_completed(urls, fetch):
+            results[index] = result
+        return results
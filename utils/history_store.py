@@ -0,0 +1,239 @@
+"""
+在庫情報の履歴を追記専用のSQLiteに保存するモジュール
+
+更新ごとに StatusMatrix を記録する。一定間隔（またはメンバー・時間帯の並びが
+変わったとき）に行列全体をキーフレームとして保存し、それ以外は前回からの
+セルの変化だけを保存する。過去のある時点の行列は、その時点以前の最新の
+キーフレームに、後続の差分を順に当てて復元する。
+
+書き込みは専用スレッドで行うので、更新処理は待たされない。
+"""
+import contextlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from utils.status_matrix import StatusMatrix
+
+
+# 履歴を保存するファイル（空文字なら保存しない）
+HISTORY_DB = os.environ.get("INVENTORY_HISTORY_DB", "inventory_history.db")
+
+# 何回の更新ごとにキーフレームを保存するか
+KEYFRAME_INTERVAL = int(os.environ.get("HISTORY_KEYFRAME_INTERVAL", "30"))
+
+# 差分1セル分の形式（行番号, 列番号, 新しい状態コード）
+DELTA_DTYPE = np.dtype([("row", "<i4"), ("column", "<i2"), ("code", "i1")])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keyframes (
+    ts REAL NOT NULL,
+    names TEXT NOT NULL,
+    slots TEXT NOT NULL,
+    codes BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS keyframes_ts ON keyframes (ts);
+CREATE TABLE IF NOT EXISTS deltas (
+    ts REAL NOT NULL,
+    keyframe_ts REAL NOT NULL,
+    cells BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deltas_keyframe_ts ON deltas (keyframe_ts, ts);
+"""
+
+
+def history_path_for(event_id):
+    """
+    イベントごとの履歴ファイルのパス（HISTORY_DB が空なら空文字）
+
+    例: inventory_history.db → inventory_history-2025-09.db
+    """
+    if not HISTORY_DB:
+        return ""
+    root, ext = os.path.splitext(HISTORY_DB)
+    return f"{root}-{event_id}{ext}"
+
+
+def encode_delta(old, new):
+    """
+    同じ並びの2つの行列の差分を圧縮したバイト列にする
+    """
+    changed = np.argwhere(old.codes != new.codes)
+    cells = np.empty(len(changed), dtype=DELTA_DTYPE)
+    cells["row"] = changed[:, 0]
+    cells["column"] = changed[:, 1]
+    cells["code"] = new.codes[changed[:, 0], changed[:, 1]]
+    return zlib.compress(cells.tobytes())
+
+
+def apply_delta(codes, blob):
+    """
+    encode_delta で作った差分を行列（codes）にその場で当てる
+    """
+    cells = np.frombuffer(zlib.decompress(blob), dtype=DELTA_DTYPE)
+    codes[cells["row"], cells["column"]] = cells["code"]
+
+
+class HistoryStore:
+    """
+    在庫情報の履歴（追記のみ）
+    """
+
+    def __init__(self, path=None, keyframe_interval=None):
+        """
+        Args:
+            path (str): SQLiteファイルのパス（省略時は HISTORY_DB）
+            keyframe_interval (int): キーフレームを保存する間隔（更新回数）
+        """
+        self.path = path or HISTORY_DB
+        self.keyframe_interval = keyframe_interval or KEYFRAME_INTERVAL
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def append(self, ts, matrix):
+        """
+        行列を履歴に追加する（書き込みは別スレッドで行い、すぐに戻る）
+
+        Args:
+            ts (float): 取得時刻（time.time()）
+            matrix (StatusMatrix): 保存する行列
+        """
+        self._ensure_writer()
+        self._queue.put((ts, matrix))
+
+    def flush(self):
+        """
+        これまでに追加した分の書き込みが終わるまで待つ
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        残りを書き込んでから書き込みスレッドを止める
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+                self._thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        return connection
+
+    def _connect_readonly(self):
+        """
+        読み出し用の接続（スキーマの作成などはしない。履歴がまだなければNone）
+        """
+        if not os.path.exists(self.path):
+            return None
+        return sqlite3.connect(Path(self.path).absolute().as_uri() + "?mode=ro", uri=True)
+
+    def _write_loop(self):
+        connection = self._connect()
+        previous = None
+        keyframe_ts = None
+        since_keyframe = 0
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    connection.close()
+                    return
+                ts, matrix = item
+                same_layout = (previous is not None and previous.names == matrix.names
+                               and previous.slots == matrix.slots)
+                with connection:
+                    if same_layout and since_keyframe < self.keyframe_interval:
+                        connection.execute(
+                            "INSERT INTO deltas (ts, keyframe_ts, cells) VALUES (?, ?, ?)",
+                            (ts, keyframe_ts, encode_delta(previous, matrix))
+                        )
+                        since_keyframe += 1
+                    else:
+                        connection.execute(
+                            "INSERT INTO keyframes (ts, names, slots, codes) VALUES (?, ?, ?, ?)",
+                            (ts, json.dumps(matrix.names, ensure_ascii=False),
+                             json.dumps(matrix.slots, ensure_ascii=False),
+                             zlib.compress(matrix.codes.tobytes()))
+                        )
+                        keyframe_ts = ts
+                        since_keyframe = 0
+                previous = matrix
+            except Exception as e:
+                # 履歴の保存に失敗しても更新処理には影響させない
+                print(f"在庫履歴の保存中にエラーが発生しました: {e}")
+                previous = None
+            finally:
+                self._queue.task_done()
+
+    def timestamps(self, start=None, end=None):
+        """
+        保存されている取得時刻の一覧（古い順）
+
+        Args:
+            start (float): この時刻以降だけ返す
+            end (float): この時刻以前だけ返す
+        """
+        start = float("-inf") if start is None else start
+        end = float("inf") if end is None else end
+        connection = self._connect_readonly()
+        if connection is None:
+            return []
+        with contextlib.closing(connection):
+            rows = connection.execute(
+                "SELECT ts FROM keyframes WHERE ts BETWEEN ? AND ? "
+                "UNION ALL SELECT ts FROM deltas WHERE ts BETWEEN ? AND ? ORDER BY ts",
+                (start, end, start, end)
+            ).fetchall()
+        return [ts for ts, in rows]
+
+    def matrix_at(self, ts):
+        """
+        ある時点で表示されていた行列を復元する
+
+        Args:
+            ts (float): 時刻（time.time()）
+
+        Returns:
+            StatusMatrix: その時点以前で最新の行列（それより前の履歴がなければNone）
+        """
+        connection = self._connect_readonly()
+        if connection is None:
+            return None
+        with contextlib.closing(connection):
+            keyframe = connection.execute(
+                "SELECT ts, names, slots, codes FROM keyframes WHERE ts <= ? ORDER BY ts DESC LIMIT 1",
+                (ts,)
+            ).fetchone()
+            if keyframe is None:
+                return None
+            keyframe_ts, names, slots, codes = keyframe
+            deltas = connection.execute(
+                "SELECT cells FROM deltas WHERE keyframe_ts = ? AND ts <= ? ORDER BY ts",
+                (keyframe_ts, ts)
+            ).fetchall()
+
+        names = json.loads(names)
+        slots = json.loads(slots)
+        codes = np.frombuffer(zlib.decompress(codes), dtype=np.int8).reshape(len(names), len(slots)).copy()
+        for cells, in deltas:
+            apply_delta(codes, cells)
+        return StatusMatrix(names, slots, codes)
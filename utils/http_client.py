@@ -0,0 +1,137 @@
+"""
+在庫とカタログの取得で共有するHTTPクライアント設定をまとめたモジュール
+
+接続プール・DNSキャッシュ・タイムアウト・リトライ間隔をここで決める。
+"""
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from dataclasses import dataclass
+
+import aiohttp
+
+from utils.fetch_metrics import create_trace_config
+from utils.fetch_scheduler import FETCH_CONCURRENCY, acquire_host_slot, retry_sleep
+
+
+# タイムアウト（秒）
+HTTP_TOTAL_TIMEOUT = float(os.environ.get("HTTP_TOTAL_TIMEOUT", "20"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+
+# 失敗時の再試行回数と待ち時間（秒）
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "5"))
+
+# 再試行の対象とするステータスコード
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# 再試行の対象とする例外
+RETRYABLE_ERRORS = (asyncio.TimeoutError, aiohttp.ClientError)
+
+
+class FetchError(Exception):
+    """
+    再試行しても取得できなかった場合の例外
+    """
+
+
+@dataclass(frozen=True)
+class PageResponse:
+    """
+    fetch_page で取得した応答（本文は読み込み済み）
+    """
+    status: int
+    headers: dict
+    body: bytes
+
+    def text(self):
+        return self.body.decode("utf-8", errors="replace")
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def create_session():
+    """
+    接続プールとタイムアウトを設定したセッションを作る
+
+    実行中のイベントループの中で呼び出すこと。
+
+    Returns:
+        aiohttp.ClientSession: 設定済みのセッション
+    """
+    connector = aiohttp.TCPConnector(
+        limit=FETCH_CONCURRENCY * 2,
+        limit_per_host=FETCH_CONCURRENCY,
+        ttl_dns_cache=300,
+        keepalive_timeout=30,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TOTAL_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=[create_trace_config()])
+
+
+def retry_delay(attempt):
+    """
+    再試行前の待ち秒数を返す（指数バックオフ + フルジッター）
+
+    Args:
+        attempt (int): 何回目の再試行か（1から）
+    """
+    return random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def fetch_page(session, url, headers=None, semaphore=None, timeout=None, host_slot=True, timing=None):
+    """
+    URLを取得して本文まで読み込む
+
+    リクエストのたびにホストごとのレート制限（fetch_scheduler）を待ち、
+    semaphore を指定すると在庫取得と同じ同時実行数の枠の中で送る。
+    5xx・429やタイムアウトの場合は間隔を空けて再試行する
+    （FetchScheduler の中から呼ぶ場合は、待つ間だけ同時実行数の枠を手放す）。
+    それ以外のステータス（304・404など）はそのまま返すので、呼び出し側で判定すること。
+
+    Args:
+        session (aiohttp.ClientSession): HTTPセッション
+        url (str): 取得するURL
+        headers (dict): リクエストヘッダー
+        semaphore (asyncio.Semaphore): 他の取得と共有する同時実行数の枠（省略可）
+        timeout (aiohttp.ClientTimeout): このリクエストだけのタイムアウト（省略時はセッションの設定）
+        host_slot (bool): 最初のリクエストの前にレート制限を待つか
+            （FetchScheduler の中から呼ぶ場合は待ち済みなので False。再試行の前は常に待つ）
+        timing (RequestTiming): 名前解決・接続・本文の受信の時間と再試行回数を書き込む記録（省略可）
+
+    Returns:
+        PageResponse: ステータス・ヘッダー・本文
+
+    Raises:
+        FetchError: 再試行しても取得できなかった場合
+    """
+    last_error = None
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        if attempt:
+            if timing is not None:
+                timing.retries = attempt
+            await retry_sleep(retry_delay(attempt))
+        try:
+            async with semaphore or contextlib.nullcontext():
+                if host_slot or attempt:
+                    await acquire_host_slot(url)
+                kwargs = {"headers": headers, "trace_request_ctx": timing}
+                if timeout is not None:
+                    kwargs["timeout"] = timeout
+                async with session.get(url, **kwargs) as response:
+                    if response.status not in RETRYABLE_STATUSES:
+                        phase_start = time.perf_counter()
+                        body = await response.read()
+                        if timing is not None:
+                            timing.download = time.perf_counter() - phase_start
+                        return PageResponse(response.status, dict(response.headers), body)
+                    last_error = f"HTTP {response.status}"
+        except RETRYABLE_ERRORS as e:
+            last_error = repr(e)
+
+    raise FetchError(f"{HTTP_MAX_RETRIES}回再試行しましたが取得できませんでした ({last_error})")
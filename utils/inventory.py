@@ -1,55 +1,140 @@
 """
 在庫情報の取得と処理を行うモジュール
 """
-import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-from utils.time_utils import is_after_final_slot_deadline, is_after_sale_start
+import time
+from dataclasses import dataclass, field
 
+from utils.fetch_metrics import RequestTiming
+from utils.fetch_scheduler import FetchScheduler
+from utils.http_client import FetchError, create_session, fetch_page
+from utils.page_cache import CachedPage, page_cache, conditional_headers
+from utils.parse_pool import run_hash_and_parse
+from utils.status_matrix import StatusMatrix
+from utils.time_utils import EVENT_SCHEDULE, FINAL, SLOT_TABLE, is_after_final_slot_deadline, is_after_sale_start
 
-async def get_inventory_status(url, session):
+
+@dataclass
+class FetchCounters:
+    """
+    1回の更新での取得結果の内訳
+
+    Attributes:
+        requested (int): 送信したリクエスト数
+        not_modified (int): 304 Not Modified で再利用したページ数
+        unchanged (int): 在庫部分のハッシュが一致して解析を省いたページ数
+        parsed (int): 解析したページ数
+        deferred (int): 取得時期が来ていないため前回の結果を使ったページ数
+        retries (int): 再試行した回数
+        failed (int): 再試行しても取得できなかったページ数
+        deduplicated (int): 同じURLをまとめたことで省いたリクエスト数
+        json_pages (int): 商品ページのHTMLの代わりにJSONで取得したページ数
+        fallbacks (int): JSONに必要な項目がなくHTMLで取り直したページ数
+        bytes_saved (int): JSONで取得したことで減った受信バイト数（HTMLで取得したときとの比較）
+        seconds_saved (float): 同じく減ったリクエスト時間の合計（秒）
+        stale_members (set): 前回取得できた結果で代用したメンバー名
+    """
+    requested: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    parsed: int = 0
+    deferred: int = 0
+    retries: int = 0
+    failed: int = 0
+    deduplicated: int = 0
+    json_pages: int = 0
+    fallbacks: int = 0
+    bytes_saved: int = 0
+    seconds_saved: float = 0.0
+    stale_members: set = field(default_factory=set)
+
+    @property
+    def skipped(self):
+        """解析を省いたページ数"""
+        return self.not_modified + self.unchanged
+
+
+async def get_inventory_status(url, session, cache=page_cache, counters=None, report=None):
     """
     URLから在庫状況を取得する
+    
+    前回の取得結果があれば条件付きリクエストを送り、
+    変化がなければ前回の解析結果を再利用する。
+    5xxやタイムアウトの場合は間隔を空けて再試行する（再試行のたびにレート制限を待つ）。
+    
+    Args:
+        url (str): 商品ページのURL
+        session (aiohttp.ClientSession): HTTPセッション
+        cache (PageCache): URLごとの前回取得結果
+        counters (FetchCounters): 取得結果の内訳を記録する（省略可）
+        report (RefreshReport): フェーズごとの時間などを記録する（省略可）
+        
+    Returns:
+        dict: 時間帯と在庫状態のマッピング
+        
+    Raises:
+        FetchError: 再試行しても取得できなかった場合
     """
-    try:
-        if url is None:
-            return {}
-            
-        async with session.get(url) as response:
-            if response.status == 200:
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                time_slots = {}
-                variation_items = soup.select('.cot-itemOrder-variationLI')
-                
-                for item in variation_items:
-                    time_slot = item.select_one('.cot-itemOrder-variationName')
-                    
-                    if time_slot:
-                        time_text = time_slot.text.strip()
-                        item_text = item.text.strip()
-                        
-                        # 再入荷通知希望または販売開始通知希望の場合は完売
-                        if "再入荷通知希望" in item_text or "販売開始通知希望" in item_text:
-                            status = "×"  # 完売
-                        else:
-                            # 残り1点かどうかをチェック
-                            stock_info = item.select_one('.cot-itemOrder-variationStock')
-                            if stock_info and "残り1点" in stock_info.text.strip():
-                                status = "⚪︎"  # 残りわずか
-                            else:
-                                status = "◎"  # 在庫あり
-                        
-                        time_slots[time_text] = status
-                
-                return time_slots
-            return {}
-    except Exception as e:
-        print(f"エラーが発生しました: {e}")
+    if counters is None:
+        counters = FetchCounters()
+    if url is None:
         return {}
+    
+    cached = cache.get(url)
+    timing = RequestTiming(url)
+    started = time.perf_counter()
+    
+    try:
+        # 同時実行数と最初のレート制限は FetchScheduler で待ち済み
+        response = await fetch_page(session, url, headers=conditional_headers(cached),
+                                    host_slot=False, timing=timing)
+        timing.status = response.status
+        
+        if response.status == 304 and cached is not None:
+            counters.not_modified += 1
+            timing.outcome = "not_modified"
+            return dict(cached.time_slots)
+        
+        if response.status != 200:
+            raise FetchError(f"HTTP {response.status}")
+        
+        timing.bytes = len(response.body)
+        
+        # ハッシュ計算と解析はイベントループの外で行う
+        phase_start = time.perf_counter()
+        body_hash, time_slots = await run_hash_and_parse(
+            response.text(), cached.body_hash if cached is not None else None
+        )
+        timing.parse = time.perf_counter() - phase_start
+        
+        if time_slots is None:
+            counters.unchanged += 1
+            timing.outcome = "unchanged"
+            time_slots = cached.time_slots
+        else:
+            counters.parsed += 1
+            timing.outcome = "parsed"
+        
+        cache.put(url, CachedPage(
+            etag=response.headers.get("ETag", ""),
+            last_modified=response.headers.get("Last-Modified", ""),
+            body_hash=body_hash,
+            time_slots=time_slots,
+        ))
+        # 呼び出し側が書き換えてもキャッシュに影響しないようコピーを返す
+        return dict(time_slots)
+    except Exception:
+        timing.outcome = "failed"
+        raise
+    finally:
+        counters.requested += 1 + timing.retries
+        counters.retries += timing.retries
+        timing.total = time.perf_counter() - started
+        if report is not None:
+            report.add(timing)
 
-async def get_inventory_with_progress(member_urls, member_names, progress_bar, status_text):
+async def get_inventory_with_progress(member_urls, member_names, progress_bar, status_text, counters=None,
+                                      session=None, policy=None, on_member_ready=None, report=None,
+                                      schedule=None, semaphore=None, source=None):
     """
     並列処理で在庫状況を取得（通常枠と最終枠の両方）
     
@@ -58,25 +143,27 @@ async def get_inventory_with_progress(member_urls, member_names, progress_bar, s
         member_names (list): メンバー名のリスト
         progress_bar (streamlit.progress): 進捗バー
         status_text (streamlit.empty): 状態テキスト
+        counters (FetchCounters): 取得結果の内訳を記録する（省略可）
+        session (aiohttp.ClientSession): 使い回すセッション（省略時はこの呼び出し用に作る）
+        policy (RefreshPolicy): 指定すると取得時期が来たURLだけを取得する（増分更新）
+        on_member_ready (callable): メンバーの結果がそろうたびに (メンバー名, 在庫情報) で呼ばれる
+        report (RefreshReport): リクエストごとの計測を記録する（省略可）
+        schedule (EventSchedule): 対象イベントの日程と時間帯（省略時は既定のイベント）
+        semaphore (asyncio.Semaphore): 他のイベントの取得と共有する同時実行数の枠（省略可）
+        source (InventorySource): 在庫状況の取得元（省略時は商品ページのHTML）
         
     Returns:
         dict: メンバー名と在庫情報のマッピング
     """
+    schedule = schedule or EVENT_SCHEDULE
+    
     # 発売開始チェック
-    if not is_after_sale_start():
+    if not is_after_sale_start(schedule):
         # 発売前は全枠をロック状態として返す
         inventory_data = {}
         
         # 全ての時間帯を定義
-        all_time_slots = [
-            "15:00-15:15", "15:15-15:30", "15:30-15:45", "15:45-16:00",
-            "16:00-16:15", "16:15-16:30", "16:30-16:45", "16:45-17:00",
-            "17:00-17:15", "17:15-17:30", "17:30-17:45", "17:45-18:00",
-            "18:00-18:15", "18:15-18:30", "18:30-18:45", "18:45-19:00",
-            "19:00-19:15", "19:15-19:30", "19:30-19:45", "19:45-20:00",
-            "20:00-20:15", "20:15-20:30", "20:30-20:45", "20:45-21:00",
-            "21:00-21:15", "21:15-21:30", "21:30-21:45", "21:45-22:00"
-        ]
+        all_time_slots = schedule.slot_table.labels
         
         for member_name in member_names:
             member_slots = {}
@@ -88,108 +175,234 @@ async def get_inventory_with_progress(member_urls, member_names, progress_bar, s
         status_text.info("発売開始前です。全枠がロック状態です。")
         return inventory_data
     
+    if counters is None:
+        counters = FetchCounters()
+    
     # 鍵閉め締切チェック
-    use_final_slots = not is_after_final_slot_deadline()
+    use_final_slots = not is_after_final_slot_deadline(schedule)
+    
+    if session is not None:
+        return await _collect_inventory(member_urls, member_names, progress_bar, status_text,
+                                        counters, session, use_final_slots, policy, on_member_ready, report,
+                                        schedule.slot_table, semaphore, source)
+    
+    async with create_session() as session:
+        return await _collect_inventory(member_urls, member_names, progress_bar, status_text,
+                                        counters, session, use_final_slots, policy, on_member_ready, report,
+                                        schedule.slot_table, semaphore, source)
+
+
+async def _collect_inventory(member_urls, member_names, progress_bar, status_text,
+                             counters, session, use_final_slots, policy, on_member_ready, report,
+                             slot_table, semaphore, source):
+    """
+    全メンバーのURLを取得し、通常枠と最終枠の結果をまとめる
+    """
+    # 通常枠と最終枠両方のURLリストを作成
+    urls_to_fetch = []
+    url_type_map = []  # URL種別のマッピング（通常枠か最終枠か）
+    member_url_map = []  # どのメンバーのどの種別のURLか
     
-    async with aiohttp.ClientSession() as session:
-        # 通常枠と最終枠両方のURLリストを作成
-        urls_to_fetch = []
-        url_type_map = []  # URL種別のマッピング（通常枠か最終枠か）
-        member_url_map = []  # どのメンバーのどの種別のURLか
+    for member_name in member_names:
+        member_url_dict = member_urls.get(member_name, {})
+        # 通常枠URL
+        normal_url = member_url_dict.get("normal")
+        if normal_url:
+            urls_to_fetch.append(normal_url)
+            url_type_map.append("normal")
+            member_url_map.append(member_name)
         
-        for member_name in member_names:
-            member_url_dict = member_urls.get(member_name, {})
-            # 通常枠URL
-            normal_url = member_url_dict.get("normal")
-            if normal_url:
-                urls_to_fetch.append(normal_url)
-                url_type_map.append("normal")
+        # 最終枠URL（日付チェックに基づいて処理）
+        if use_final_slots:
+            final_url = member_url_dict.get("final")
+            if final_url:
+                urls_to_fetch.append(final_url)
+                url_type_map.append("final")
                 member_url_map.append(member_name)
-            
-            # 最終枠URL（日付チェックに基づいて処理）
-            if use_final_slots:
-                final_url = member_url_dict.get("final")
-                if final_url:
-                    urls_to_fetch.append(final_url)
-                    url_type_map.append("final")
-                    member_url_map.append(member_name)
-        
-        total = len(urls_to_fetch)
-        completed = 0
-        results = []
-        
-        chunk_size = 15
-        for i in range(0, total, chunk_size):
-            chunk_urls = urls_to_fetch[i:i+chunk_size]
-            
-            # 進捗状況表示の更新
-            status_text.info(f"在庫情報を取得中です... ({int(completed/total*100)}%)")
-
-            # チャンク内のタスクを実行
-            tasks = [get_inventory_status(url, session) for url in chunk_urls]
-            chunk_results = await asyncio.gather(*tasks)
-            results.extend(chunk_results)
-            
-            # 進捗を更新
-            completed += len(chunk_urls)
-            progress_bar.progress(completed / total)
-            
-            # サーバー負荷軽減のための待機
-            await asyncio.sleep(0.1)  # 並列数を上げるので待機時間を少し短縮
-        
-        # 結果を辞書にまとめる
-        inventory_data = {}
-        final_slot_data = {}  # 最終枠の在庫情報を一時保存
-        
-        for i, result in enumerate(results):
-            member_name = member_url_map[i]
-            url_type = url_type_map[i]
-            
-            if url_type == "normal":
-                # 通常枠のデータ
-                if member_name not in inventory_data:
-                    inventory_data[member_name] = result
-            else:
-                # 最終枠のデータ
-                final_slot_data[member_name] = result
+    
+    total = len(urls_to_fetch)
+    results = [None] * total
+    
+    # 同じURL（最終枠に通常枠のURLが入っている場合や、CSVの重複行）は1回だけ取得し、
+    # 結果を必要な (メンバー, 種別) すべてに配る
+    url_indices = {}
+    for i, url in enumerate(urls_to_fetch):
+        url_indices.setdefault(url, []).append(i)
+    counters.deduplicated += total - len(url_indices)
+    
+    if report is not None:
+        report.url_members = {
+            url: ", ".join(dict.fromkeys(member_url_map[i] for i in indices))
+            for url, indices in url_indices.items()
+        }
+    
+    def fan_out(indices, result):
+        # メンバーごとに書き換えられても影響しないよう、2つ目以降はコピーを渡す
+        results[indices[0]] = result
+        for i in indices[1:]:
+            results[i] = dict(result)
+    
+    # 増分更新: 取得時期が来ていないURLは前回の結果をそのまま使う
+    due_urls = []
+    for url, indices in url_indices.items():
+        cached = page_cache.get(url)
+        if policy is not None and cached is not None and not policy.is_due(url):
+            fan_out(indices, dict(cached.time_slots))
+            counters.deferred += 1
+        else:
+            due_urls.append(url)
+    due_total = len(due_urls)
+    completed = 0
+    
+    # メンバーごとに、まだ結果が届いていないURLの数を数える
+    member_indices = {}
+    for i, member_name in enumerate(member_url_map):
+        member_indices.setdefault(member_name, []).append(i)
+    pending_counts = {member_name: 0 for member_name in member_indices}
+    for url in due_urls:
+        for i in url_indices[url]:
+            pending_counts[member_url_map[i]] += 1
+    
+    def emit_member(member_name):
+        if on_member_ready is None:
+            return
+        member_data = _merge_member_results(
+            member_indices[member_name], results, url_type_map, use_final_slots, slot_table
+        )
+        if member_data is not None:
+            on_member_ready(member_name, member_data)
+    
+    # 全URLが取得省略されたメンバーはすぐに確定する
+    for member_name, count in pending_counts.items():
+        if count == 0:
+            emit_member(member_name)
+    
+    # 進捗状況表示の更新
+    status_text.info("在庫情報を取得中です... (0%)")
+    
+    fetch_status = source.fetch if source is not None else get_inventory_status
+    
+    async def fetch(url):
+        cached = page_cache.get(url)
+        try:
+            result = await fetch_status(url, session, counters=counters, report=report)
+        except Exception as e:
+            counters.failed += 1
+            print(f"エラーが発生しました: {url} {e}")
+            return None
+        if policy is not None:
+            policy.record(url, cached.time_slots if cached is not None else None, result)
+        return result
+    
+    # 常に一定数のリクエストを実行中に保ち、終わったものから受け取る
+    scheduler = FetchScheduler(report=report, semaphore=semaphore)
+    async for due_index, result in scheduler.as_completed(due_urls, fetch):
+        url = due_urls[due_index]
+        indices = url_indices[url]
+        if result is None:
+            # 取得に失敗したURLは前回取得できた結果で代用する
+            cached = page_cache.get(url)
+            result = dict(cached.time_slots) if cached is not None else {}
+            counters.stale_members.update(member_url_map[i] for i in indices)
+        fan_out(indices, result)
         
-        # 日付チェックに基づいて最終枠の処理を行う
-        if use_final_slots:
-            # 通常枠の後ろ4枠を最終枠のデータで塗り替え
-            for member_name, final_data in final_slot_data.items():
-                # 最終枠の状態を確認
-                final_sold_out = False
-                has_final_data = False
-                
-                # 最終枠のデータがあれば、完売状態を確認
-                if final_data:
-                    has_final_data = True
-                    # 最終枠のすべての時間帯が完売（×）かチェック
-                    all_slots_sold_out = all(status == "×" for status in final_data.values())
-                    # 少なくとも1つの時間帯が完売（×）かチェック
-                    any_slot_sold_out = any(status == "×" for status in final_data.values())
-                    
-                    final_sold_out = all_slots_sold_out
-                
-                # 通常枠のデータがあれば、後ろ4枠を修正
-                if member_name in inventory_data and has_final_data:
-                    # 後ろ4枠の時間帯を特定（21:00以降）
-                    normal_data = inventory_data[member_name]
-                    
-                    for time_slot in list(normal_data.keys()):
-                        # 21:00以降の枠を特定
-                        if time_slot.startswith("21:"):
-                            if final_sold_out:
-                                # 最終枠が完売していれば、×で上書き
-                                normal_data[time_slot] = "×"
-                            else:
-                                # 最終枠が完売していなければ、◎で上書き
-                                normal_data[time_slot] = "◎"
-        
-        # 完了表示
-        status_text.success(f"在庫情報の取得が完了しました！ {total}/{total} 完了 (100%)")
+        # メンバーの全URLがそろったら通知する
+        for index in indices:
+            member_name = member_url_map[index]
+            pending_counts[member_name] -= 1
+            if pending_counts[member_name] == 0:
+                emit_member(member_name)
         
-        return inventory_data
+        # 進捗を更新
+        completed += 1
+        progress_bar.progress(completed / due_total)
+        status_text.info(f"在庫情報を取得中です... ({int(completed/due_total*100)}%)")
+    
+    # 結果を辞書にまとめる
+    inventory_data = {}
+    final_slot_data = {}  # 最終枠の在庫情報を一時保存
+    
+    for i, result in enumerate(results):
+        member_name = member_url_map[i]
+        url_type = url_type_map[i]
+        
+        if url_type == "normal":
+            # 通常枠のデータ
+            if member_name not in inventory_data:
+                inventory_data[member_name] = result
+        else:
+            # 最終枠のデータ
+            final_slot_data[member_name] = result
+    
+    # 日付チェックに基づいて最終枠の処理を行う
+    if use_final_slots:
+        # 通常枠の後ろ4枠を最終枠のデータで塗り替え
+        for member_name, final_data in final_slot_data.items():
+            if member_name in inventory_data:
+                apply_final_slot_overlay(inventory_data[member_name], final_data, slot_table)
+    
+    # 完了表示
+    message = (
+        f"在庫情報の取得が完了しました！ {total}/{total} 完了 (100%) "
+        f"変更なし: {counters.skipped}件 取得省略: {counters.deferred}件 重複URL: {counters.deduplicated}件"
+    )
+    if counters.json_pages or counters.fallbacks:
+        message += (
+            f" JSON: {counters.json_pages}件 (HTML取り直し: {counters.fallbacks}件, "
+            f"節約: {counters.bytes_saved / 1024:.0f}KB / {counters.seconds_saved:.1f}秒)"
+        )
+    status_text.success(message)
+    
+    return inventory_data
+
+
+def apply_final_slot_overlay(normal_data, final_data, slot_table=None):
+    """
+    最終枠の在庫状況で通常枠の21時台を塗り替える
+    
+    Args:
+        normal_data (dict): 通常枠の時間帯と在庫状態のマッピング（直接書き換える）
+        final_data (dict): 最終枠の時間帯と在庫状態のマッピング
+        slot_table (SlotTable): 対象イベントの時間帯一覧（省略時は既定のイベント）
+    """
+    slot_table = slot_table or SLOT_TABLE
+    
+    # 最終枠のデータがなければ何もしない
+    if not final_data:
+        return
+    
+    # 最終枠のすべての時間帯が完売（×）かチェック
+    final_sold_out = all(status == "×" for status in final_data.values())
+    
+    # 後ろ4枠の時間帯を特定（21:00以降）
+    for time_slot in list(normal_data.keys()):
+        if slot_table.has_flag(time_slot, FINAL):
+            if final_sold_out:
+                # 最終枠が完売していれば、×で上書き
+                normal_data[time_slot] = "×"
+            else:
+                # 最終枠が完売していなければ、◎で上書き
+                normal_data[time_slot] = "◎"
+
+
+def _merge_member_results(indices, results, url_type_map, use_final_slots, slot_table=None):
+    """
+    1人分の取得結果から表示用の在庫情報を作る（results は書き換えない）
+    
+    通常枠は最初の結果、最終枠は最後の結果を使う。通常枠がなければNone。
+    """
+    normal_data = None
+    final_data = None
+    for i in indices:
+        if url_type_map[i] == "normal":
+            if normal_data is None:
+                normal_data = dict(results[i])
+        else:
+            final_data = results[i]
+    
+    if normal_data is not None and use_final_slots:
+        apply_final_slot_overlay(normal_data, final_data, slot_table)
+    return normal_data
 
 
 def calculate_sold_out_counts(inventory_data, sorted_time_slots):
@@ -197,12 +410,16 @@ def calculate_sold_out_counts(inventory_data, sorted_time_slots):
     時間帯ごとの完売数をカウント
     
     Args:
-        inventory_data (dict): メンバー名と在庫情報のマッピング
+        inventory_data (dict | StatusMatrix): メンバー名と在庫情報のマッピング
         sorted_time_slots (list): ソートされた時間帯のリスト
         
     Returns:
         dict: 時間帯と完売数のマッピング
     """
+    # 行列で渡された場合は一括演算で集計する
+    if isinstance(inventory_data, StatusMatrix):
+        return inventory_data.sold_out_counts(sorted_time_slots)
+    
     sold_out_counts = {}
     
     for time_slot in sorted_time_slots:
@@ -225,11 +442,15 @@ def calculate_member_sales_count(member_names, inventory_data):
     
     Args:
         member_names (list): メンバー名のリスト
-        inventory_data (dict): メンバー名と在庫情報のマッピング
+        inventory_data (dict | StatusMatrix): メンバー名と在庫情報のマッピング
         
     Returns:
         dict: メンバー名と売上数のマッピング
     """
+    # 行列で渡された場合は一括演算で集計する
+    if isinstance(inventory_data, StatusMatrix):
+        return inventory_data.member_sales_count(member_names)
+    
     member_sales_count = {}
     
     for member_name in member_names:
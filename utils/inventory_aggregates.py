@@ -0,0 +1,140 @@
+"""
+セルの変化から完売数・売上数を増分で更新するモジュール
+
+更新のたびに全メンバー × 全時間帯を数え直すのではなく、
+前回との差分（メンバー, 時間帯, 旧状態, 新状態）だけを集計に反映する。
+"""
+from collections import Counter, namedtuple
+
+import numpy as np
+
+from utils.status_matrix import CODE_STATUSES, MISSING
+from utils.time_utils import CROWDED_THRESHOLD
+
+
+# 1セルの変化（存在しなかった/なくなったセルの状態はNone）
+CellChange = namedtuple("CellChange", ["member", "slot", "old", "new"])
+
+SOLD_OUT_STATUS = "×"
+
+
+def diff_matrices(old, new):
+    """
+    2つの StatusMatrix の差分をセル単位で返す
+
+    メンバーと時間帯の並びが同じ場合は行列の比較だけで済ませる。
+
+    Args:
+        old (StatusMatrix): 前回の行列（初回はNone）
+        new (StatusMatrix): 今回の行列
+
+    Returns:
+        list: CellChange のリスト
+    """
+    if old is not None and old.names == new.names and old.slots == new.slots:
+        changes = []
+        for row, column in np.argwhere(old.codes != new.codes):
+            old_code = old.codes[row, column]
+            new_code = new.codes[row, column]
+            changes.append(CellChange(
+                new.names[row],
+                new.slots[column],
+                CODE_STATUSES[old_code] if old_code != MISSING else None,
+                CODE_STATUSES[new_code] if new_code != MISSING else None,
+            ))
+        return changes
+
+    # メンバーや時間帯が増減した場合は辞書として比較する
+    old_view = old if old is not None else {}
+    changes = []
+    for name in dict.fromkeys(list(old_view) + list(new)):
+        old_row = old_view.get(name, {})
+        new_row = new.get(name, {})
+        for slot in dict.fromkeys(list(old_row) + list(new_row)):
+            before = old_row.get(slot)
+            after = new_row.get(slot)
+            if before != after:
+                changes.append(CellChange(name, slot, before, after))
+    return changes
+
+
+class InventoryAggregates:
+    """
+    時間帯ごと・メンバーごと・グループごとの完売数（読み取り専用として扱う）
+
+    apply は元の集計を書き換えずに結果を返すので、
+    スナップショットごとに持たせても互いに影響しない。
+    """
+
+    def __init__(self, member_groups_map=None):
+        """
+        Args:
+            member_groups_map (dict): メンバー名 → グループ名
+        """
+        self.member_groups_map = member_groups_map or {}
+        self.slot_sold_out = Counter()
+        self.member_sales = Counter()
+        self.group_slot_sold_out = {}
+
+    def apply(self, changes):
+        """
+        差分を反映した新しい集計を返す（O(変化数)）
+
+        完売数が変わる変化がなければ自身をそのまま返し、
+        変化があった Counter だけをコピーする。
+
+        Args:
+            changes (list): CellChange のリスト
+
+        Returns:
+            InventoryAggregates: 更新後の集計
+        """
+        deltas = []
+        for change in changes:
+            delta = (change.new == SOLD_OUT_STATUS) - (change.old == SOLD_OUT_STATUS)
+            if delta:
+                deltas.append((change, delta))
+        if not deltas:
+            return self
+
+        updated = InventoryAggregates(self.member_groups_map)
+        updated.slot_sold_out = self.slot_sold_out.copy()
+        updated.member_sales = self.member_sales.copy()
+        updated.group_slot_sold_out = dict(self.group_slot_sold_out)
+
+        copied_groups = set()
+        for change, delta in deltas:
+            updated.slot_sold_out[change.slot] += delta
+            updated.member_sales[change.member] += delta
+            group = self.member_groups_map.get(change.member)
+            if group is None:
+                continue
+            if group not in copied_groups:
+                updated.group_slot_sold_out[group] = updated.group_slot_sold_out.get(group, Counter()).copy()
+                copied_groups.add(group)
+            updated.group_slot_sold_out[group][change.slot] += delta
+        return updated
+
+    def sold_out_counts(self, time_slots):
+        """
+        時間帯ごとの完売数（全メンバー）
+        """
+        return {slot: self.slot_sold_out[slot] for slot in time_slots}
+
+    def member_sales_count(self, member_names):
+        """
+        メンバーごとの売上数（完売枠の数）
+        """
+        return {name: self.member_sales[name] for name in member_names}
+
+    def crowded_time_slots(self, time_slots, threshold=CROWDED_THRESHOLD):
+        """
+        完売数が閾値以上の時間帯を混雑とみなす
+        """
+        return {slot: self.slot_sold_out[slot] >= threshold for slot in time_slots}
+
+    def group_sales_count(self):
+        """
+        グループごとの売上数の合計
+        """
+        return {group: sum(counts.values()) for group, counts in self.group_slot_sold_out.items()}
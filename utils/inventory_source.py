@@ -0,0 +1,245 @@
+"""
+在庫状況の取得元を切り替えるモジュール
+
+取得元は商品ページのURLを受け取り、時間帯と在庫状態のマッピングを返す。
+
+- html: 商品ページのHTMLを取得して解析する（従来の方法）
+- json: 商品のJSON（INVENTORY_JSON_URL）からバリエーションごとの在庫数を読む。
+  JSONが取得できない・JSONでない・時間帯名や在庫数が欠けている場合はHTMLで取り直す。
+
+json は各URLを最初にHTMLで取得し、そのときの受信バイト数と時間を基準として覚える。
+2回目以降はJSONで取得し、基準との差を節約できた量として FetchCounters に数える。
+JSONが使えなかったURLは JSON_RETRY_INTERVAL の間HTMLだけで取得する
+（JSONとHTMLの2回のリクエストを毎回送らないため）。
+環境変数 INVENTORY_SOURCE で切り替える。
+"""
+import dataclasses
+import hashlib
+import os
+import time
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
+
+from utils.fetch_metrics import RequestTiming
+from utils.fetch_scheduler import acquire_host_slot
+from utils.http_client import FetchError, fetch_page
+from utils.inventory import FetchCounters, get_inventory_status
+from utils.page_cache import CachedPage, conditional_headers, page_cache
+
+
+# 使用する取得元（"html" または "json"）
+INVENTORY_SOURCE = os.environ.get("INVENTORY_SOURCE", "html")
+
+# 商品のJSONのURL（{url} は商品ページのURL、{item_id} は商品ID）
+INVENTORY_JSON_URL = os.environ.get("INVENTORY_JSON_URL", "{url}?response_type=json")
+
+# JSONが使えなかったURLを、再びJSONで試すまでの秒数
+JSON_RETRY_INTERVAL = float(os.environ.get("INVENTORY_JSON_RETRY_INTERVAL", "3600"))
+
+
+def parse_inventory_json(data):
+    """
+    商品のJSONから時間帯ごとの在庫状況を抽出する
+
+    {"variations": [{"name": "15:00~15:15", "stock": 3}, ...]} の形を想定する。
+
+    Args:
+        data: JSONを読み込んだ値
+
+    Returns:
+        dict: 時間帯と在庫状態のマッピング（必要な項目が欠けていればNone）
+    """
+    variations = data.get("variations") if isinstance(data, dict) else None
+    if not variations:
+        return None
+
+    time_slots = {}
+    for variation in variations:
+        name = variation.get("name") if isinstance(variation, dict) else None
+        stock = variation.get("stock") if isinstance(variation, dict) else None
+        if not isinstance(name, str) or not isinstance(stock, int) or isinstance(stock, bool):
+            return None
+        if stock <= 0:
+            status = "×"  # 完売
+        elif stock == 1:
+            status = "⚪︎"  # 残りわずか
+        else:
+            status = "◎"  # 在庫あり
+        time_slots[name.strip()] = status
+    return time_slots
+
+
+class InventorySource(ABC):
+    """
+    在庫状況の取得元
+    """
+
+    name = ""
+
+    @abstractmethod
+    async def fetch(self, url, session, cache=page_cache, counters=None, report=None):
+        """
+        URLから在庫状況を取得する（引数と例外は get_inventory_status と同じ）
+
+        Returns:
+            dict: 時間帯と在庫状態のマッピング
+        """
+
+
+class HtmlInventorySource(InventorySource):
+    """
+    商品ページのHTMLを解析する
+    """
+
+    name = "html"
+
+    async def fetch(self, url, session, cache=page_cache, counters=None, report=None):
+        return await get_inventory_status(url, session, cache=cache, counters=counters, report=report)
+
+
+class _TimingTap:
+    """
+    get_inventory_status の記録を受け取りつつ、元のレポートにも渡す
+    """
+
+    def __init__(self, report):
+        self.report = report
+        self.timing = None
+
+    def add(self, timing):
+        self.timing = timing
+        if self.report is not None:
+            self.report.add(timing)
+
+
+class JsonInventorySource(InventorySource):
+    """
+    商品のJSONから在庫数を読み、足りなければHTMLで取り直す
+    """
+
+    name = "json"
+
+    def __init__(self, url_template=None, fallback=None):
+        """
+        Args:
+            url_template (str): 商品のJSONのURL（省略時は INVENTORY_JSON_URL）
+            fallback (InventorySource): JSONで取得できないときの取得元（省略時はHTML）
+        """
+        self.url_template = url_template or INVENTORY_JSON_URL
+        self.fallback = fallback or HtmlInventorySource()
+        # URLごとのHTMLでの取得コスト（受信バイト数, 時間）
+        self._html_costs = {}
+        # JSONが使えなかったURL → 再びJSONで試す時刻（time.monotonic()）
+        self._json_retry_at = {}
+
+    def json_url(self, url):
+        item_id = urlparse(url).path.rstrip("/").rsplit("/", 1)[-1]
+        return self.url_template.format(url=url, item_id=item_id)
+
+    async def fetch(self, url, session, cache=page_cache, counters=None, report=None):
+        if counters is None:
+            counters = FetchCounters()
+        if url is None:
+            return {}
+
+        baseline = self._html_costs.get(url)
+        if baseline is None:
+            # 初回はHTMLで取得し、節約量の基準にする
+            return await self._fetch_html(url, session, cache, counters, report)
+        if time.monotonic() < self._json_retry_at.get(url, 0.0):
+            return await self._fetch_html(url, session, cache, counters, report)
+
+        json_url = self.json_url(url)
+        cached = cache.get(json_url)
+        timing = RequestTiming(json_url)
+        started = time.perf_counter()
+        time_slots = None
+
+        try:
+            # 同時実行数と最初のレート制限は FetchScheduler で待ち済み
+            response = await fetch_page(session, json_url, headers=conditional_headers(cached),
+                                        host_slot=False, timing=timing)
+        except FetchError:
+            response = None
+        counters.requested += 1 + timing.retries
+        counters.retries += timing.retries
+
+        if response is not None:
+            timing.status = response.status
+            timing.bytes = len(response.body)
+            if response.status == 304 and cached is not None:
+                time_slots = cached.time_slots
+                counters.not_modified += 1
+                timing.outcome = "not_modified"
+            elif response.status == 200:
+                try:
+                    time_slots = parse_inventory_json(response.json())
+                except ValueError:
+                    time_slots = None
+                if time_slots is not None:
+                    counters.parsed += 1
+                    timing.outcome = "parsed"
+                    cache.put(json_url, CachedPage(
+                        etag=response.headers.get("ETag", ""),
+                        last_modified=response.headers.get("Last-Modified", ""),
+                        body_hash=hashlib.blake2b(response.body, digest_size=16).digest(),
+                        time_slots=time_slots,
+                    ))
+
+        timing.total = time.perf_counter() - started
+        if time_slots is None:
+            timing.outcome = "fallback"
+            if report is not None:
+                report.add(timing)
+            counters.fallbacks += 1
+            if response is not None:
+                # 応答はあったがJSONとして使えない → しばらくHTMLだけにする
+                self._json_retry_at[url] = time.monotonic() + JSON_RETRY_INTERVAL
+            # HTMLの取り直しは別のリクエストなので、その分のレート制限も待つ
+            await acquire_host_slot(url)
+            return await self._fetch_html(url, session, cache, counters, report)
+
+        if report is not None:
+            report.add(timing)
+        html_bytes, html_seconds = baseline
+        counters.json_pages += 1
+        counters.bytes_saved += html_bytes - timing.bytes
+        counters.seconds_saved += html_seconds - timing.total
+        self._json_retry_at.pop(url, None)
+        # 増分更新と取得失敗時の代用は商品ページのURLで前回の結果を引くので、そこも更新する
+        # （HTMLの条件付きリクエスト・ハッシュ比較に使う値はそのまま残す）
+        html_page = cache.get(url)
+        if html_page is None:
+            html_page = CachedPage(etag="", last_modified="", body_hash=b"")
+        cache.put(url, dataclasses.replace(html_page, time_slots=time_slots))
+        return dict(time_slots)
+
+    async def _fetch_html(self, url, session, cache, counters, report):
+        tap = _TimingTap(report)
+        result = await self.fallback.fetch(url, session, cache=cache, counters=counters, report=tap)
+        timing = tap.timing
+        if timing is not None and timing.status == 200:
+            self._html_costs[url] = (timing.bytes, timing.total)
+        return result
+
+
+INVENTORY_SOURCES = {
+    "html": HtmlInventorySource,
+    "json": JsonInventorySource,
+}
+
+_sources = {}
+
+
+def get_inventory_source(name=None):
+    """
+    プロセスで共有する取得元を返す
+
+    Args:
+        name (str): "html" または "json"（省略時は INVENTORY_SOURCE）
+    """
+    name = name or INVENTORY_SOURCE
+    source = _sources.get(name)
+    if source is None:
+        source = _sources[name] = INVENTORY_SOURCES[name]()
+    return source
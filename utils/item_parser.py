@@ -0,0 +1,183 @@
+"""
+商品ページのHTMLから時間帯ごとの在庫状況を抽出するモジュール
+
+BeautifulSoupで文書全体の木を作らず、`cot-itemOrder-variationLI` の
+ブロックだけを正規表現で走査する。比較用にBeautifulSoup版も残してあり、
+環境変数 ITEM_PARSER_BACKEND で切り替えられる。
+"""
+import os
+import re
+from html import unescape
+
+
+# 在庫状況の判定に使うクラス名と文言
+VARIATION_CLASS = "cot-itemOrder-variationLI"
+NAME_CLASS = "cot-itemOrder-variationName"
+STOCK_CLASS = "cot-itemOrder-variationStock"
+SOLD_OUT_MARKERS = ("再入荷通知希望", "販売開始通知希望")
+LAST_ONE_MARKER = "残り1点"
+
+# 使用するパーサー（"scanner" または "bs4"）
+PARSER_BACKEND = os.environ.get("ITEM_PARSER_BACKEND", "scanner")
+
+_STRIP_TAGS = re.compile(r'<[^>]*>')
+
+
+def _open_tag_pattern(class_name):
+    """
+    指定クラスを持つ開始タグにマッチする正規表現を作る
+    """
+    return re.compile(
+        r'<([a-zA-Z][\w-]*)\s[^>]*?class\s*=\s*(["\'])(?:[^"\']*\s)?'
+        + re.escape(class_name)
+        + r'(?:\s[^"\']*)?\2[^>]*>'
+    )
+
+
+_VARIATION_OPEN = _open_tag_pattern(VARIATION_CLASS)
+_NAME_OPEN = _open_tag_pattern(NAME_CLASS)
+_STOCK_OPEN = _open_tag_pattern(STOCK_CLASS)
+_SAME_TAG_CACHE = {}
+
+
+def _element_end(html, tag, start, limit):
+    """
+    開始タグの直後(start)から、対応する終了タグの位置を返す
+
+    同名タグの入れ子は深さを数えて読み飛ばす。見つからなければlimitを返す。
+    """
+    pattern = _SAME_TAG_CACHE.get(tag)
+    if pattern is None:
+        pattern = re.compile(r'<(/?)' + re.escape(tag) + r'\b[^>]*?(/?)>', re.IGNORECASE)
+        _SAME_TAG_CACHE[tag] = pattern
+
+    depth = 1
+    for m in pattern.finditer(html, start, limit):
+        if m.group(1):
+            depth -= 1
+            if depth == 0:
+                return m.start()
+        elif not m.group(2):
+            depth += 1
+    return limit
+
+
+def _text(fragment):
+    """
+    タグを除いたテキストを返す（BeautifulSoupの .text 相当）
+    """
+    return unescape(_STRIP_TAGS.sub('', fragment))
+
+
+def _find_text(html, pattern, start, end):
+    """
+    範囲内で最初に見つかった要素のテキストを返す。なければNone
+    """
+    m = pattern.search(html, start, end)
+    if not m:
+        return None
+    inner_end = _element_end(html, m.group(1), m.end(), end)
+    return _text(html[m.end():inner_end])
+
+
+def parse_inventory_scanner(html):
+    """
+    正規表現の走査で在庫状況を抽出する
+
+    Args:
+        html (str): 商品ページのHTML
+
+    Returns:
+        dict: 時間帯と在庫状態のマッピング
+    """
+    time_slots = {}
+    length = len(html)
+    pos = 0
+
+    while True:
+        m = _VARIATION_OPEN.search(html, pos)
+        if not m:
+            break
+        block_start = m.end()
+        block_end = _element_end(html, m.group(1), block_start, length)
+        pos = block_start
+
+        time_text = _find_text(html, _NAME_OPEN, block_start, block_end)
+        if time_text is None:
+            continue
+        item_text = _text(html[block_start:block_end])
+
+        # 再入荷通知希望または販売開始通知希望の場合は完売
+        if any(marker in item_text for marker in SOLD_OUT_MARKERS):
+            status = "×"  # 完売
+        else:
+            # 残り1点かどうかをチェック
+            stock_text = _find_text(html, _STOCK_OPEN, block_start, block_end)
+            if stock_text and LAST_ONE_MARKER in stock_text:
+                status = "⚪︎"  # 残りわずか
+            else:
+                status = "◎"  # 在庫あり
+
+        time_slots[time_text.strip()] = status
+
+    return time_slots
+
+
+def parse_inventory_bs4(html):
+    """
+    BeautifulSoupで在庫状況を抽出する（従来の実装）
+
+    Args:
+        html (str): 商品ページのHTML
+
+    Returns:
+        dict: 時間帯と在庫状態のマッピング
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    time_slots = {}
+    variation_items = soup.select('.' + VARIATION_CLASS)
+
+    for item in variation_items:
+        time_slot = item.select_one('.' + NAME_CLASS)
+
+        if time_slot:
+            time_text = time_slot.text.strip()
+            item_text = item.text.strip()
+
+            # 再入荷通知希望または販売開始通知希望の場合は完売
+            if any(marker in item_text for marker in SOLD_OUT_MARKERS):
+                status = "×"  # 完売
+            else:
+                # 残り1点かどうかをチェック
+                stock_info = item.select_one('.' + STOCK_CLASS)
+                if stock_info and LAST_ONE_MARKER in stock_info.text.strip():
+                    status = "⚪︎"  # 残りわずか
+                else:
+                    status = "◎"  # 在庫あり
+
+            time_slots[time_text] = status
+
+    return time_slots
+
+
+PARSER_BACKENDS = {
+    "scanner": parse_inventory_scanner,
+    "bs4": parse_inventory_bs4,
+}
+
+
+def parse_inventory_html(html, backend=None):
+    """
+    商品ページのHTMLから時間帯ごとの在庫状況を抽出する
+
+    Args:
+        html (str): 商品ページのHTML
+        backend (str): 使用するパーサー（省略時は PARSER_BACKEND）
+
+    Returns:
+        dict: 時間帯と在庫状態のマッピング
+    """
+    return PARSER_BACKENDS[backend or PARSER_BACKEND](html)
@@ -0,0 +1,83 @@
+"""
+商品ページの取得結果をURLごとに覚えておくモジュール
+
+ETag / Last-Modified による条件付きリクエストと、
+在庫部分のハッシュ比較で、変化のないページの再解析を省く。
+"""
+import hashlib
+import threading
+from dataclasses import dataclass, field
+
+from utils.item_parser import VARIATION_CLASS
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """
+    前回取得したページの情報
+
+    Attributes:
+        etag (str): ETagヘッダー
+        last_modified (str): Last-Modifiedヘッダー
+        body_hash (bytes): 在庫部分のハッシュ
+        time_slots (dict): 解析済みの時間帯と在庫状態のマッピング
+    """
+    etag: str
+    last_modified: str
+    body_hash: bytes
+    time_slots: dict = field(default_factory=dict)
+
+
+def hash_variation_region(html):
+    """
+    在庫表示部分（最初のバリエーションから最後のバリエーションのリスト終端まで）のハッシュを返す
+
+    広告や閲覧数などページの他の部分が変わっても同じ値になる。
+    バリエーションが見つからない場合はページ全体のハッシュを返す。
+    """
+    start = html.find(VARIATION_CLASS)
+    if start == -1:
+        region = html
+    else:
+        end = html.find('</ul>', html.rfind(VARIATION_CLASS))
+        region = html[start:end] if end != -1 else html[start:]
+    return hashlib.blake2b(region.encode('utf-8'), digest_size=16).digest()
+
+
+class PageCache:
+    """
+    URLごとの CachedPage を保持する（スレッドセーフ）
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            return self._pages.get(url)
+
+    def put(self, url, page):
+        with self._lock:
+            self._pages[url] = page
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+
+def conditional_headers(page):
+    """
+    前回の取得結果から条件付きリクエスト用のヘッダーを作る
+    """
+    headers = {}
+    if page is not None:
+        if page.etag:
+            headers["If-None-Match"] = page.etag
+        if page.last_modified:
+            headers["If-Modified-Since"] = page.last_modified
+    return headers
+
+
+# プロセス全体で共有するキャッシュ
+page_cache = PageCache()
@@ -0,0 +1,81 @@
+"""
+商品ページの解析をイベントループの外で実行するモジュール
+
+解析中も他のレスポンスの受信やリクエストの送信が止まらないよう、
+ハッシュ計算と解析をスレッドプールまたはプロセスプールに任せる。
+環境変数 PARSE_EXECUTOR で "inline" / "thread" / "process" を選べる。
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils.item_parser import parse_inventory_html
+from utils.page_cache import hash_variation_region
+
+
+# 解析の実行方法（"inline" / "thread" / "process"）
+PARSE_EXECUTOR = os.environ.get("PARSE_EXECUTOR", "inline")
+
+# プールのワーカー数
+PARSE_WORKERS = int(os.environ.get("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def hash_and_parse(html, previous_hash=None):
+    """
+    在庫部分のハッシュを計算し、前回と異なる場合だけ解析する
+
+    プロセスプールに渡せるよう、モジュールの最上位に定義している。
+
+    Args:
+        html (str): 商品ページのHTML
+        previous_hash (bytes): 前回の在庫部分のハッシュ（なければNone）
+
+    Returns:
+        tuple: (ハッシュ, 時間帯と在庫状態のマッピング)。ハッシュが同じなら後者はNone
+    """
+    body_hash = hash_variation_region(html)
+    if body_hash == previous_hash:
+        return body_hash, None
+    return body_hash, parse_inventory_html(html)
+
+
+def get_executor(mode):
+    """
+    実行方法に応じたプールを返す（inline の場合はNone）
+    """
+    if mode == "inline":
+        return None
+    with _executors_lock:
+        executor = _executors.get(mode)
+        if executor is None:
+            if mode == "thread":
+                executor = ThreadPoolExecutor(max_workers=PARSE_WORKERS, thread_name_prefix="inventory-parser")
+            elif mode == "process":
+                executor = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+            else:
+                raise ValueError(f"不明な PARSE_EXECUTOR: {mode}")
+            _executors[mode] = executor
+        return executor
+
+
+async def run_hash_and_parse(html, previous_hash=None, mode=None):
+    """
+    hash_and_parse を設定された方法で実行する
+
+    Args:
+        html (str): 商品ページのHTML
+        previous_hash (bytes): 前回の在庫部分のハッシュ（なければNone）
+        mode (str): 実行方法（省略時は PARSE_EXECUTOR）
+
+    Returns:
+        tuple: hash_and_parse の戻り値
+    """
+    executor = get_executor(mode or PARSE_EXECUTOR)
+    if executor is None:
+        return hash_and_parse(html, previous_hash)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, hash_and_parse, html, previous_hash)
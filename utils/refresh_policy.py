@@ -0,0 +1,109 @@
+"""
+URLごとの再取得間隔を在庫の状態と変化の頻度から決めるモジュール
+
+全枠完売のページはほとんど変わらないので間隔を大きく空け、
+よく変化するページは毎回取得する。
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+
+# 全枠完売のページを再確認する間隔（秒）
+SOLD_OUT_INTERVAL = float(os.environ.get("SOLD_OUT_INTERVAL", "600"))
+
+# 変化のないページを再確認する最大間隔（秒）
+STABLE_MAX_INTERVAL = float(os.environ.get("STABLE_MAX_INTERVAL", "120"))
+
+# 変化率の指数移動平均の重み
+VOLATILITY_ALPHA = 0.3
+
+
+@dataclass
+class UrlState:
+    """
+    URLごとの取得状況
+
+    Attributes:
+        last_fetched (float): 最後に取得した時刻
+        volatility (float): 取得ごとに変化があったかの指数移動平均（0〜1）
+        sold_out (bool): 全枠完売かどうか
+    """
+    last_fetched: float
+    volatility: float = 1.0
+    sold_out: bool = False
+
+
+def is_fully_sold_out(time_slots):
+    """
+    全ての時間帯が完売（×）かどうか
+    """
+    return bool(time_slots) and all(status == "×" for status in time_slots.values())
+
+
+class RefreshPolicy:
+    """
+    どのURLを今回の更新で取得するかを決める（スレッドセーフ）
+    """
+
+    def __init__(self, sold_out_interval=SOLD_OUT_INTERVAL, stable_max_interval=STABLE_MAX_INTERVAL):
+        """
+        Args:
+            sold_out_interval (float): 全枠完売のページの再取得間隔（秒）
+            stable_max_interval (float): 変化のないページの最大再取得間隔（秒）
+        """
+        self.sold_out_interval = sold_out_interval
+        self.stable_max_interval = stable_max_interval
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def interval(self, state):
+        """
+        状態から再取得までの間隔を返す
+        """
+        if state.sold_out:
+            return self.sold_out_interval
+        return self.stable_max_interval * (1.0 - state.volatility)
+
+    def is_due(self, url, now=None):
+        """
+        今回の更新で取得すべきかどうか
+
+        一度も取得していないURLは常に取得する。
+        """
+        with self._lock:
+            state = self._states.get(url)
+        if state is None:
+            return True
+        now = time.time() if now is None else now
+        return now - state.last_fetched >= self.interval(state)
+
+    def record(self, url, previous, current, now=None):
+        """
+        取得結果を記録する
+
+        Args:
+            url (str): 取得したURL
+            previous (dict): 前回の時間帯と在庫状態のマッピング（なければNone）
+            current (dict): 今回の時間帯と在庫状態のマッピング
+            now (float): 取得時刻（省略時は現在時刻）
+        """
+        now = time.time() if now is None else now
+        changed = 1.0 if previous != current else 0.0
+        with self._lock:
+            state = self._states.get(url)
+            if state is None:
+                state = UrlState(last_fetched=now)
+                self._states[url] = state
+            else:
+                state.volatility = VOLATILITY_ALPHA * changed + (1 - VOLATILITY_ALPHA) * state.volatility
+                state.last_fetched = now
+            state.sold_out = is_fully_sold_out(current)
+
+    def forget(self, url):
+        """
+        URLの状態を忘れ、次回は必ず取得させる
+        """
+        with self._lock:
+            self._states.pop(url, None)
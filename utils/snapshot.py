@@ -0,0 +1,300 @@
+"""
+在庫スナップショットをプロセス全体で共有するモジュール
+
+ブラウザセッションごとにスクレイピングするのではなく、
+バックグラウンドの更新スレッドが1つだけ在庫情報を取得し、
+各セッションは最新のスナップショットを読むだけにする。
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+import pytz
+
+from utils.fetch_engine import get_fetch_engine
+from utils.fetch_metrics import RefreshReport, start_metrics_server
+from utils.history_store import HistoryStore, history_path_for
+from utils.inventory import FetchCounters, get_inventory_with_progress
+from utils.inventory_source import get_inventory_source
+from utils.inventory_aggregates import InventoryAggregates, diff_matrices
+from utils.refresh_policy import RefreshPolicy
+from utils.status_matrix import StatusMatrix
+from utils.time_utils import EVENT_SCHEDULE, is_after_final_slot_deadline
+
+
+# スナップショットの有効期間（秒）。環境変数で上書きできる
+REFRESH_TTL = float(os.environ.get("INVENTORY_REFRESH_TTL", "60"))
+
+# 変化の少ないページの取得頻度を下げる増分更新を使うかどうか
+INCREMENTAL_REFRESH = os.environ.get("INCREMENTAL_REFRESH", "1") != "0"
+
+# 指定するとこのポートで計測レポートを公開する（/metrics, /report.json）
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+
+jst = pytz.timezone('Asia/Tokyo')
+
+# 計測レポートを公開するストア（イベントID → SnapshotStore）。サーバーはプロセスに1つ
+_stores = {}
+_stores_lock = threading.Lock()
+_metrics_server = None
+
+
+def _latest_reports():
+    with _stores_lock:
+        stores = dict(_stores)
+    reports = {}
+    for event_id, store in stores.items():
+        snapshot = store.get()
+        if snapshot is not None and snapshot.report is not None:
+            reports[event_id] = snapshot.report
+    return reports
+
+
+def _register_store(store):
+    """
+    ストアを計測レポートの対象に加え、必要なら計測サーバーを起動する
+    """
+    global _metrics_server
+    with _stores_lock:
+        _stores[store.schedule.event_id] = store
+        if METRICS_PORT and _metrics_server is None:
+            _metrics_server = start_metrics_server(METRICS_PORT, _latest_reports)
+
+
+@dataclass(frozen=True)
+class InventorySnapshot:
+    """
+    ある時点の在庫情報（読み取り専用として扱う）
+
+    Attributes:
+        version (int): 更新ごとに増える番号
+        inventory_data (dict): メンバー名と在庫情報のマッピング
+        all_time_slots (frozenset): 全メンバーに現れた時間帯
+        last_update_time (str): 表示用の最終更新時刻
+        using_final_slots (bool): 最終枠を使用して取得したかどうか
+        fetched_at (float): 取得完了時刻（time.time()）
+        fetch_counters (FetchCounters): この更新での取得結果の内訳
+        report (RefreshReport): この更新でのリクエストごとの計測
+        matrix (StatusMatrix): inventory_data を行列にしたもの（集計用）
+        changes (tuple): 前回のスナップショットからのセルの変化（CellChange）
+        aggregates (InventoryAggregates): 差分で更新した完売数・売上数
+    """
+    version: int
+    inventory_data: dict
+    all_time_slots: frozenset
+    last_update_time: str
+    using_final_slots: bool
+    fetched_at: float
+    fetch_counters: FetchCounters = None
+    report: RefreshReport = None
+    matrix: StatusMatrix = None
+    changes: tuple = ()
+    aggregates: InventoryAggregates = None
+
+
+class RefreshProgress:
+    """
+    バックグラウンド更新の進捗を保持する
+
+    get_inventory_with_progress に st.progress / st.empty の代わりとして渡せるよう、
+    progress / info / success のメソッドだけを持つ。
+    """
+
+    def __init__(self):
+        self.fraction = 0.0
+        self.message = ""
+
+    def progress(self, value):
+        self.fraction = value
+
+    def info(self, message):
+        self.message = message
+
+    def success(self, message):
+        self.message = message
+
+
+class SnapshotStore:
+    """
+    最新の在庫スナップショットを保持し、バックグラウンドで定期更新する
+    """
+
+    def __init__(self, ttl=REFRESH_TTL, incremental=INCREMENTAL_REFRESH, history_path=None,
+                 schedule=None, engine=None, source=None):
+        """
+        Args:
+            ttl (float): スナップショットを更新する間隔（秒）
+            incremental (bool): 増分更新を使うかどうか
+            history_path (str): 更新ごとの履歴を保存するファイル（省略時はイベントごとのファイル、空なら保存しない）
+            schedule (EventSchedule): 対象イベントの日程と時間帯（省略時は既定のイベント）
+            engine (FetchEngine): 取得に使う共有エンジン（省略時はプロセス共有のもの）
+            source (InventorySource): 在庫状況の取得元（省略時は INVENTORY_SOURCE で選んだもの）
+        """
+        self.ttl = ttl
+        self.schedule = schedule or EVENT_SCHEDULE
+        self.engine = engine or get_fetch_engine()
+        self.source = source or get_inventory_source()
+        self.policy = RefreshPolicy() if incremental else None
+        if history_path is None:
+            history_path = history_path_for(self.schedule.event_id)
+        self.history = HistoryStore(history_path) if history_path else None
+        self.progress = RefreshProgress()
+        self.partial_data = {}
+        self._snapshot = None
+        self._member_urls = {}
+        self._member_names = []
+        self._member_groups_map = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._ready = threading.Condition(self._lock)
+        self._thread = None
+
+    def set_members(self, member_urls, member_names, member_groups_map=None):
+        """
+        監視対象のメンバーを設定する。変更があれば即時に再取得する
+
+        Args:
+            member_urls (dict): メンバー名と通常枠/最終枠URLの辞書
+            member_names (list): メンバー名のリスト
+            member_groups_map (dict): メンバー名 → グループ名（グループ別の集計に使う）
+        """
+        member_groups_map = member_groups_map or {}
+        with self._lock:
+            changed = (member_urls != self._member_urls or list(member_names) != self._member_names
+                       or member_groups_map != self._member_groups_map)
+            if changed:
+                self._member_urls = dict(member_urls)
+                self._member_names = list(member_names)
+                self._member_groups_map = dict(member_groups_map)
+        if changed:
+            self._wakeup.set()
+        self.start()
+
+    def start(self):
+        """
+        更新スレッドを起動する（起動済みなら何もしない）
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name=f"inventory-refresher-{self.schedule.event_id}", daemon=True
+            )
+            self._thread.start()
+        _register_store(self)
+
+    def get_partial(self):
+        """
+        更新中に結果がそろったメンバーの在庫情報を返す（コピー）
+        """
+        with self._lock:
+            return self.partial_data.copy()
+
+    def get(self):
+        """
+        最新のスナップショットを返す。まだ一度も取得していなければNone
+        """
+        return self._snapshot
+
+    def wait_for_snapshot(self, timeout=None):
+        """
+        最初のスナップショットが用意されるまで待つ
+
+        Args:
+            timeout (float): 最大待機秒数（Noneなら無制限）
+
+        Returns:
+            InventorySnapshot: 最新のスナップショット（タイムアウト時はNone）
+        """
+        with self._ready:
+            self._ready.wait_for(lambda: self._snapshot is not None, timeout=timeout)
+            return self._snapshot
+
+    def _is_stale(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            return True
+        # 最終枠の使用状態が変わった場合も取り直す
+        if snapshot.using_final_slots != (not is_after_final_slot_deadline(self.schedule)):
+            return True
+        return time.time() - snapshot.fetched_at >= self.ttl
+
+    def _run(self):
+        while True:
+            forced = self._wakeup.is_set()
+            self._wakeup.clear()
+            if forced or self._is_stale():
+                try:
+                    self._refresh()
+                except Exception as e:
+                    # 失敗しても直前のスナップショットを使い続ける
+                    print(f"在庫情報の更新中にエラーが発生しました: {e}")
+            self._wakeup.wait(timeout=self.ttl)
+
+    def _fetch(self, member_urls, member_names, counters, report):
+        # 接続プールと同時実行数の枠は他のイベントのストアと共有する
+        return self.engine.run(lambda session, semaphore: get_inventory_with_progress(
+            member_urls, member_names, self.progress, self.progress, counters,
+            session=session, policy=self.policy, on_member_ready=self._on_member_ready,
+            report=report, schedule=self.schedule, semaphore=semaphore, source=self.source
+        ))
+
+    def _on_member_ready(self, member_name, member_data):
+        # 取得途中の表示用に、そろったメンバーから公開する
+        with self._lock:
+            self.partial_data[member_name] = member_data
+
+    def _refresh(self):
+        with self._lock:
+            member_urls = self._member_urls
+            member_names = self._member_names
+            member_groups_map = self._member_groups_map
+
+        using_final_slots = not is_after_final_slot_deadline(self.schedule)
+        self.progress = RefreshProgress()
+        # 更新ごとに新しい辞書にする（前回の途中経過は見せない）
+        with self._lock:
+            self.partial_data = {}
+        counters = FetchCounters()
+        report = RefreshReport(counters)
+        inventory_data = self._fetch(member_urls, member_names, counters, report)
+        report.finish()
+
+        # 全ての時間帯を収集
+        all_time_slots = set()
+        for member_data in inventory_data.values():
+            all_time_slots.update(member_data.keys())
+
+        previous = self._snapshot
+        matrix = StatusMatrix.from_inventory(inventory_data, all_time_slots)
+
+        # 前回との差分だけを集計に反映する（グループ構成が変わったら作り直す）
+        if previous is not None and previous.aggregates.member_groups_map == member_groups_map:
+            changes = diff_matrices(previous.matrix, matrix)
+            aggregates = previous.aggregates.apply(changes)
+        else:
+            changes = diff_matrices(None, matrix)
+            aggregates = InventoryAggregates(member_groups_map).apply(changes)
+
+        snapshot = InventorySnapshot(
+            version=(previous.version + 1) if previous else 1,
+            inventory_data=inventory_data,
+            all_time_slots=frozenset(all_time_slots),
+            last_update_time=datetime.now(jst).strftime("%Y-%m-%d %H:%M:%S"),
+            using_final_slots=using_final_slots,
+            fetched_at=time.time(),
+            fetch_counters=counters,
+            report=report,
+            matrix=matrix,
+            changes=tuple(changes),
+            aggregates=aggregates,
+        )
+        with self._ready:
+            self._snapshot = snapshot
+            self._ready.notify_all()
+
+        # 履歴への書き込みは別スレッドに任せる
+        if self.history is not None:
+            self.history.append(snapshot.fetched_at, matrix)
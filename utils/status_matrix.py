@@ -0,0 +1,173 @@
+"""
+在庫情報を メンバー × 時間帯 の int8 行列で保持するモジュール
+
+完売数や売上数の集計を行列の一括演算で行う。
+辞書と同じように読めるビューも用意しているので、
+inventory_data[name][slot] の形で読む既存の処理はそのまま使える。
+"""
+from collections.abc import Mapping
+
+import numpy as np
+
+from utils.time_utils import CROWDED_THRESHOLD, sort_time_slots
+
+
+# 在庫状態と行列に入れるコードの対応（0は「その時間帯がない」）
+STATUS_CODES = {
+    "◎": 1,
+    "⚪︎": 2,
+    "○": 3,
+    "×": 4,
+    "🔒": 5,
+}
+CODE_STATUSES = [None] + list(STATUS_CODES)
+SOLD_OUT = STATUS_CODES["×"]
+MISSING = 0
+
+
+class MemberRow(Mapping):
+    """
+    1人分の行を 時間帯 → 在庫状態 の辞書として読むビュー
+    """
+
+    def __init__(self, matrix, row):
+        self._matrix = matrix
+        self._row = row
+
+    def __getitem__(self, time_slot):
+        column = self._matrix.slot_index.get(time_slot)
+        if column is None:
+            raise KeyError(time_slot)
+        code = self._matrix.codes[self._row, column]
+        if code == MISSING:
+            raise KeyError(time_slot)
+        return CODE_STATUSES[code]
+
+    def __iter__(self):
+        row = self._matrix.codes[self._row]
+        return (self._matrix.slots[i] for i in np.flatnonzero(row))
+
+    def __len__(self):
+        return int(np.count_nonzero(self._matrix.codes[self._row]))
+
+
+class StatusMatrix(Mapping):
+    """
+    在庫情報の列指向表現
+
+    Mapping として メンバー名 → MemberRow を返すので、
+    従来の inventory_data と同じように読める。
+
+    Attributes:
+        names (list): 行に対応するメンバー名
+        slots (list): 列に対応する時間帯（開始時刻順）
+        codes (numpy.ndarray): メンバー × 時間帯 の int8 行列
+        name_index (dict): メンバー名 → 行番号
+        slot_index (dict): 時間帯 → 列番号
+    """
+
+    def __init__(self, names, slots, codes):
+        self.names = list(names)
+        self.slots = list(slots)
+        self.codes = codes
+        self.name_index = {name: i for i, name in enumerate(self.names)}
+        self.slot_index = {slot: i for i, slot in enumerate(self.slots)}
+
+    @classmethod
+    def from_inventory(cls, inventory_data, time_slots=None):
+        """
+        メンバー名と在庫情報の辞書から行列を作る
+
+        Args:
+            inventory_data (dict): メンバー名と在庫情報のマッピング
+            time_slots (iterable): 列にする時間帯（省略時は全メンバーに現れた時間帯）
+
+        Returns:
+            StatusMatrix: 作成した行列
+        """
+        if time_slots is None:
+            time_slots = set()
+            for member_data in inventory_data.values():
+                time_slots.update(member_data.keys())
+        slots = sort_time_slots(time_slots)
+        slot_index = {slot: i for i, slot in enumerate(slots)}
+
+        names = list(inventory_data.keys())
+        codes = np.zeros((len(names), len(slots)), dtype=np.int8)
+        for row, name in enumerate(names):
+            for time_slot, status in inventory_data[name].items():
+                column = slot_index.get(time_slot)
+                code = STATUS_CODES.get(status)
+                if column is not None and code is not None:
+                    codes[row, column] = code
+        return cls(names, slots, codes)
+
+    def __getitem__(self, name):
+        row = self.name_index.get(name)
+        if row is None:
+            raise KeyError(name)
+        return MemberRow(self, row)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _columns(self, time_slots):
+        return [self.slot_index.get(slot, -1) for slot in time_slots]
+
+    def sold_out_counts(self, time_slots=None):
+        """
+        時間帯ごとの完売数
+
+        Args:
+            time_slots (list): 集計する時間帯（省略時は全列）
+
+        Returns:
+            dict: 時間帯と完売数のマッピング
+        """
+        counts = (self.codes == SOLD_OUT).sum(axis=0)
+        if time_slots is None:
+            return dict(zip(self.slots, counts.tolist()))
+        return {
+            slot: int(counts[column]) if column >= 0 else 0
+            for slot, column in zip(time_slots, self._columns(time_slots))
+        }
+
+    def member_sales_count(self, member_names=None):
+        """
+        メンバーごとの売上数（完売枠の数）
+
+        Args:
+            member_names (list): 集計するメンバー名（省略時は全行）
+
+        Returns:
+            dict: メンバー名と売上数のマッピング
+        """
+        sales = (self.codes == SOLD_OUT).sum(axis=1)
+        if member_names is None:
+            return dict(zip(self.names, sales.tolist()))
+        return {
+            name: int(sales[self.name_index[name]]) if name in self.name_index else 0
+            for name in member_names
+        }
+
+    def crowded_time_slots(self, time_slots=None, threshold=CROWDED_THRESHOLD):
+        """
+        完売数が閾値以上の時間帯を混雑とみなす
+
+        Args:
+            time_slots (list): 判定する時間帯（省略時は全列）
+            threshold (int): 混雑とみなす完売数
+
+        Returns:
+            dict: 時間帯と混雑状態のマッピング
+        """
+        crowded = (self.codes == SOLD_OUT).sum(axis=0) >= threshold
+        if time_slots is None:
+            return dict(zip(self.slots, crowded.tolist()))
+        return {
+            slot: bool(crowded[column]) if column >= 0 else False
+            for slot, column in zip(time_slots, self._columns(time_slots))
+        }
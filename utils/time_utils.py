@@ -1,10 +1,242 @@
 """
 時間帯の処理を行うユーティリティ関数
 """
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
 from datetime import datetime
 import pytz
 
 
+# 時間帯の区分（ビットマスク）
+EARLY = 1      # 15:00-18:00
+REGULAR = 2    # 18:00-22:00
+FINAL = 4      # 21:00-22:00（最終枠で塗り替える後ろ4枠）
+
+
+def parse_slot_start(time_slot):
+    """
+    "HH:MM-HH:MM" の開始時刻を0時からの分数にする（読めなければ0）
+    """
+    if '-' in time_slot:
+        start_time = time_slot.split('-')[0].strip()
+        if ':' in start_time:
+            hours, minutes = map(int, start_time.split(':'))
+            return hours * 60 + minutes
+    return 0
+
+
+def format_slot_label(start_minute, length):
+    """
+    開始時刻（分）と長さ（分）から "HH:MM-HH:MM" の文字列を作る
+    """
+    end_minute = start_minute + length
+    return f"{start_minute // 60}:{start_minute % 60:02d}-{end_minute // 60}:{end_minute % 60:02d}"
+
+
+class SlotTable:
+    """
+    イベントの時間帯一覧（開始時刻順、読み取り専用として扱う）
+    
+    時間帯の文字列に 0 から始まる番号（slot ID）を振り、
+    開始時刻・区分・表示名を番号で引けるようにしておく。
+    StatusMatrix の列もこの順番になる。
+    
+    Attributes:
+        labels (tuple): slot ID → 時間帯の文字列
+        ids (dict): 時間帯の文字列 → slot ID
+        start_minutes (tuple): slot ID → 開始時刻（0時からの分）
+        flags (tuple): slot ID → 区分のビットマスク
+        display_labels (tuple): slot ID → 表示用の開始時刻（"HH:MM"）
+    """
+    
+    def __init__(self, start_minutes, length, regular_start, final_start):
+        """
+        Args:
+            start_minutes (list): 各時間帯の開始時刻（0時からの分）
+            length (int): 1枠の長さ（分）
+            regular_start (int): 通常時間帯の開始時刻（分）。これより前は早い時間帯
+            final_start (int): 最終枠で塗り替える時間帯の開始時刻（分）
+        """
+        self.length = length
+        self.regular_start = regular_start
+        self.final_start = final_start
+        self.start_minutes = tuple(sorted(start_minutes))
+        self.labels = tuple(sys.intern(format_slot_label(m, length)) for m in self.start_minutes)
+        self.ids = {label: slot_id for slot_id, label in enumerate(self.labels)}
+        self.flags = tuple(self._flags_for(m) for m in self.start_minutes)
+        self.display_labels = tuple(label.split('-')[0] for label in self.labels)
+    
+    def _flags_for(self, start_minute):
+        if start_minute < self.regular_start:
+            return EARLY
+        flags = REGULAR
+        if start_minute >= self.final_start:
+            flags |= FINAL
+        return flags
+    
+    def slot_id(self, time_slot):
+        """
+        時間帯の slot ID（表にない時間帯はNone）
+        """
+        return self.ids.get(time_slot)
+    
+    def start_minute(self, time_slot):
+        """
+        時間帯の開始時刻（分）。表にない時間帯は文字列から読む
+        """
+        slot_id = self.ids.get(time_slot)
+        if slot_id is None:
+            return parse_slot_start(time_slot)
+        return self.start_minutes[slot_id]
+    
+    def has_flag(self, time_slot, flag):
+        """
+        時間帯が指定の区分に入るかどうか
+        
+        表にない時間帯は開始時刻から判定する（最初の枠より前・最後の枠より後はどの区分にも入らない）。
+        """
+        slot_id = self.ids.get(time_slot)
+        if slot_id is not None:
+            return bool(self.flags[slot_id] & flag)
+        start_minute = parse_slot_start(time_slot)
+        if (not self.start_minutes or start_minute < self.start_minutes[0]
+                or start_minute >= self.start_minutes[-1] + self.length):
+            return False
+        return bool(self._flags_for(start_minute) & flag)
+    
+    def sort(self, time_slots):
+        """
+        時間帯を開始時刻順に並べる
+        """
+        return sorted(time_slots, key=self.start_minute)
+
+
+def build_slot_table(first_start="15:00", last_end="22:00", length=15,
+                     regular_start="18:00", final_start="21:00"):
+    """
+    一定間隔の時間帯から SlotTable を作る
+    
+    Args:
+        first_start (str): 最初の枠の開始時刻（"HH:MM"）
+        last_end (str): 最後の枠の終了時刻（"HH:MM"）
+        length (int): 1枠の長さ（分）
+        regular_start (str): 通常時間帯の開始時刻（"HH:MM"）
+        final_start (str): 最終枠で塗り替える時間帯の開始時刻（"HH:MM"）
+        
+    Returns:
+        SlotTable: 作成した時間帯一覧
+    """
+    def minutes(hh_mm):
+        hours, mins = map(int, hh_mm.split(':'))
+        return hours * 60 + mins
+    
+    return SlotTable(
+        range(minutes(first_start), minutes(last_end), length),
+        length,
+        minutes(regular_start),
+        minutes(final_start),
+    )
+
+
+# イベント設定ファイル（発売開始・鍵閉め日時・時間帯・混雑の閾値）
+# 複数のイベントを同時に監視する場合はカンマ区切りで並べる（先頭が既定のイベント）
+EVENT_CONFIG = os.environ.get("EVENT_CONFIG", "event.json")
+
+
+@dataclass(frozen=True)
+class EventSchedule:
+    """
+    イベントの日程と時間帯（読み取り専用）
+    
+    Attributes:
+        name (str): イベント名
+        sale_start (float): 発売開始時刻（エポック秒）
+        final_slot_deadline (float): 最終枠の締め切り時刻（エポック秒）
+        slot_table (SlotTable): 時間帯一覧
+        crowded_threshold (int): 混雑とみなす完売数
+        event_id (str): イベントを区別するID（設定ファイルの "id"、なければファイル名）
+        members_csv (str): このイベントのメンバー一覧のCSV
+    """
+    name: str
+    sale_start: float
+    final_slot_deadline: float
+    slot_table: SlotTable
+    crowded_threshold: int
+    event_id: str = "event"
+    members_csv: str = "members.csv"
+
+
+def parse_event_time(value, timezone):
+    """
+    "YYYY-MM-DD HH:MM:SS"（タイムゾーンなしなら timezone とみなす）をエポック秒にする
+    """
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = pytz.timezone(timezone).localize(moment)
+    return moment.timestamp()
+
+
+def load_event_schedule(path=None):
+    """
+    イベント設定ファイルを読み込んで EventSchedule を作る
+    
+    Args:
+        path (str): 設定ファイルのパス（省略時は EVENT_CONFIG）
+        
+    Returns:
+        EventSchedule: イベントの日程と時間帯
+    """
+    path = path or EVENT_CONFIG.split(",")[0]
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    
+    timezone = config.get("timezone", "Asia/Tokyo")
+    return EventSchedule(
+        name=config.get("name", ""),
+        sale_start=parse_event_time(config["sale_start"], timezone),
+        final_slot_deadline=parse_event_time(config["final_slot_deadline"], timezone),
+        slot_table=build_slot_table(**config.get("slots", {})),
+        crowded_threshold=int(config.get("crowded_threshold", 15)),
+        event_id=config.get("id") or os.path.splitext(os.path.basename(path))[0],
+        members_csv=config.get("members", "members.csv"),
+    )
+
+
+def load_event_schedules(paths=None):
+    """
+    複数のイベント設定ファイルを読み込む
+    
+    Args:
+        paths (list): 設定ファイルのパス（省略時は EVENT_CONFIG のカンマ区切り）
+        
+    Returns:
+        dict: イベントID → EventSchedule（設定ファイルの順）
+    """
+    if paths is None:
+        paths = [path.strip() for path in EVENT_CONFIG.split(",") if path.strip()]
+    schedules = {}
+    for path in paths:
+        schedule = load_event_schedule(path)
+        schedules[schedule.event_id] = schedule
+    return schedules
+
+
+# プロセス起動時に1度だけ読み込む（イベントを切り替えるときは設定ファイルを書き換えて再起動）
+EVENT_SCHEDULES = load_event_schedules()
+
+# 既定のイベント
+EVENT_SCHEDULE = next(iter(EVENT_SCHEDULES.values()))
+
+# イベントの時間帯一覧
+SLOT_TABLE = EVENT_SCHEDULE.slot_table
+
+# 混雑とみなす完売数
+CROWDED_THRESHOLD = EVENT_SCHEDULE.crowded_threshold
+
+
 def is_early_time_slot(time_slot):
     """
     時間帯が15:00-15:15から17:45-18:00の範囲かどうかをチェックする
@@ -15,12 +247,7 @@ def is_early_time_slot(time_slot):
     Returns:
         bool: 早い時間帯の場合はTrue
     """
-    early_slots = [
-        "15:00-15:15", "15:15-15:30", "15:30-15:45", "15:45-16:00",
-        "16:00-16:15", "16:15-16:30", "16:30-16:45", "16:45-17:00",
-        "17:00-17:15", "17:15-17:30", "17:30-17:45", "17:45-18:00"
-    ]
-    return time_slot in early_slots
+    return SLOT_TABLE.has_flag(time_slot, EARLY)
 
 
 def is_regular_time_slot(time_slot):
@@ -33,8 +260,7 @@ def is_regular_time_slot(time_slot):
     Returns:
         bool: 通常時間帯の場合はTrue
     """
-    # 18:00-18:15から21:45-22:00までの時間帯
-    return time_slot.startswith(("18:", "19:", "20:", "21:"))
+    return SLOT_TABLE.has_flag(time_slot, REGULAR)
 
 
 def is_all_regular_slots_sold_out(member_data, sorted_time_slots):
@@ -62,31 +288,14 @@ def is_all_regular_slots_sold_out(member_data, sorted_time_slots):
 
 
 def sort_time_slots(time_slots):
-    def parse_time_range(time_range):
-        if '-' in time_range:
-            start_time = time_range.split('-')[0].strip()
-            if ':' in start_time:
-                hours, minutes = map(int, start_time.split(':'))
-                return hours * 60 + minutes
-        return 0
-    
-    return sorted(list(time_slots), key=parse_time_range)
+    return SLOT_TABLE.sort(time_slots)
 
 
-def is_after_final_slot_deadline():
-    jst = pytz.timezone('Asia/Tokyo')
-    now = datetime.now(jst)
-    
-    deadline = datetime(2025, 9, 7, 23, 59, 59, tzinfo=jst)
-    
-    return now > deadline
+def is_after_final_slot_deadline(schedule=None):
+    schedule = schedule or EVENT_SCHEDULE
+    return time.time() > schedule.final_slot_deadline
 
 
-def is_after_sale_start():
-    jst = pytz.timezone('Asia/Tokyo')
-    now = datetime.now(jst)
-    
-    # 発売開始日時を定義
-    sale_start = datetime(2025, 9, 1, 22, 0, 0, tzinfo=jst)
-    
-    return now >= sale_start
\ No newline at end of file
+def is_after_sale_start(schedule=None):
+    schedule = schedule or EVENT_SCHEDULE
+    return time.time() >= schedule.sale_start
@@ -1,6 +1,10 @@
 """
 UI表示やHTMLテーブル生成に関する関数
 """
+from functools import lru_cache
+
+from utils.time_utils import CROWDED_THRESHOLD
+
 
 def format_time_slot_display(time_slot):
     """
@@ -16,11 +20,134 @@ def format_time_slot_display(time_slot):
         return time_slot.split('-')[0].strip()
     return time_slot
 
+# 在庫状態ごとの表示（表示文字, セルのクラス）
+STATUS_DISPLAY = {
+    "◎": ("○", "last-one"),
+    "⚪︎": ("○", "last-one"),
+    "○": ("○", "last-one"),
+    "×": ("×", "sold-out"),
+    "🔒": ("🔒", "locked"),
+}
+
+# 在庫状態ごとのセルHTML
+STATUS_CELLS = {
+    status: f'<td class="status-cell {status_class}">{display_status}</td>'
+    for status, (display_status, status_class) in STATUS_DISPLAY.items()
+}
+
+PENDING_CELL = '<td class="status-cell pending">…</td>'
+
+STALE_MARKER = '<span class="stale-marker" title="取得に失敗したため前回の情報を表示しています">⚠</span>'
+
+TABLE_START = """
+    <div class="table-scroll-container">
+        <table class="inventory-table">
+    """
+
+TABLE_END = "</tbody></table></div>"
+
+# 行・ヘッダーのHTMLを覚えておく件数
+ROW_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=8)
+def render_legend(crowded_threshold=CROWDED_THRESHOLD):
+    """
+    凡例のHTMLを作る
+    
+    Args:
+        crowded_threshold (int): 混雑とみなす完売数
+        
+    Returns:
+        str: 凡例のHTML
+    """
+    return f"""
+        <div class="footnote" style="margin-bottom: 15px;">
+            <span class="legend-item"><span style="color: #fd7e14; font-weight: bold;">オレンジ</span> : 混雑({crowded_threshold}人以上)</span>
+            <span class="legend-item"><span style="color: #6c757d;">🔒</span> : 未解放</span>
+            <span class="legend-item"><span style="color: #dc3545;">×</span> : 完売</span>
+            <span class="legend-item"><span style="color: #198754;">⚪︎</span> : 購入可能</span>
+            <span class="legend-item"><span style="color: #ffc107;">⚠</span> : 前回取得時の情報</span>
+        </div>"""
+
+
+def _status_cell(status):
+    if status is None:
+        return PENDING_CELL
+    cell = STATUS_CELLS.get(status)
+    if cell is None:
+        cell = f'<td class="status-cell ">{status}</td>'
+    return cell
+
+
+@lru_cache(maxsize=ROW_CACHE_SIZE)
+def render_member_row(member_name, normal_url, sales_count, stale, statuses):
+    """
+    メンバー1人分の行HTMLを作る
+    
+    引数が同じなら前回作ったHTMLをそのまま返すので、
+    状態が変わった行だけが作り直される。
+    
+    Args:
+        member_name (str): メンバー名
+        normal_url (str): 通常枠のURL
+        sales_count (int): 売上数
+        stale (bool): 前回の情報を表示しているかどうか
+        statuses (tuple): 時間帯順の在庫状態（取得待ちの行はNone）
+        
+    Returns:
+        str: <tr>...</tr> のHTML
+    """
+    from utils.data_loader import format_member_name
+    
+    # メンバー名セル - 縦方向中央揃えのためのフレックスボックスコンテナを使用
+    parts = [
+        '<tr><td class="member-cell"><div class="member-name-container">',
+        f'<a href="{normal_url}" target="_blank" class="member-link">{format_member_name(member_name)}</a>',
+        STALE_MARKER if stale else "",
+        f'<span class="member-sales-count">{sales_count}</span></div></td>',
+    ]
+    parts.extend(_status_cell(status) for status in statuses)
+    parts.append("</tr>")
+    return "".join(parts)
+
+
+@lru_cache(maxsize=64)
+def render_header(header_cells):
+    """
+    時間帯ヘッダー行のHTMLを作る
+    
+    Args:
+        header_cells (tuple): (時間帯, 完売数, 混雑しているか) のタプル
+        
+    Returns:
+        str: <thead>...</thead> のHTML
+    """
+    parts = ['<thead><tr><th class="corner-header">メンバー名</th>']
+    for time_slot, sold_out_count, crowded in header_cells:
+        time_display = format_time_slot_display(time_slot)
+        if crowded:
+            parts.append(
+                f'<th class="time-header crowded"><span class="crowded-label">{time_display}</span>'
+                f'<span class="sold-out-count crowded">{sold_out_count}</span></th>'
+            )
+        else:
+            parts.append(
+                f'<th class="time-header">{time_display}'
+                f'<span class="sold-out-count">{sold_out_count}</span></th>'
+            )
+    parts.append("</tr></thead>")
+    return "".join(parts)
+
+
 def generate_table_html(filtered_members, sorted_time_slots, inventory_data, member_urls, 
-                        member_groups_map, sold_out_counts, crowded_time_slots, member_sales_count):
+                        member_groups_map, sold_out_counts, crowded_time_slots, member_sales_count,
+                        stale_members=None, pending_members=None):
     """
     在庫情報を表示するHTMLテーブルを生成
     
+    ヘッダーと各行のHTMLはキャッシュしておき、最後に1回の join でつなげる。
+    
     Args:
         filtered_members (list): フィルタリングされたメンバー情報リスト
         sorted_time_slots (list): ソートされた時間帯のリスト
@@ -30,110 +157,59 @@ def generate_table_html(filtered_members, sorted_time_slots, inventory_data, mem
         sold_out_counts (dict): 時間帯と完売数のマッピング
         crowded_time_slots (dict): 時間帯と混雑状態のマッピング
         member_sales_count (dict): メンバー名と売上数のマッピング
+        stale_members (set): 取得に失敗し前回の情報を表示しているメンバー名
+        pending_members (set): まだ結果が届いていないメンバー名（取得途中の表示用）
         
     Returns:
         str: 生成されたHTMLテーブル
     """
-    from utils.data_loader import format_member_name
-        
-    # フィルター用のメンバー名リスト
-    filtered_member_names = [member["name"] for member in filtered_members]
-    
-    # テーブルHTMLを生成
-    html = """
-    <div class="table-scroll-container">
-        <table class="inventory-table">
-    """
+    stale_members = stale_members or ()
+    pending_members = pending_members or ()
     
-    # ヘッダー行
-    html += "<thead><tr>"
-    html += '<th class="corner-header">メンバー名</th>'
+    header = render_header(tuple(
+        (time_slot, sold_out_counts[time_slot], bool(crowded_time_slots[time_slot]))
+        for time_slot in sorted_time_slots
+    ))
+    pending_statuses = (None,) * len(sorted_time_slots)
     
-    # 時間帯ヘッダー
-    for time_slot in sorted_time_slots:
-        time_display = format_time_slot_display(time_slot)
-        header_class = "time-header"
+    parts = [TABLE_START, header, "<tbody>"]
+    for member in filtered_members:
+        member_name = member["name"]
         
-        if crowded_time_slots[time_slot]:
-            header_class += " crowded"
-            time_slot_display = f'<span class="crowded-label">{time_display}</span>'
-        else:
-            time_slot_display = time_display
-        
-        # 完売数ラベルを追加
-        sold_out_count = sold_out_counts[time_slot]
-        count_class = "sold-out-count crowded" if crowded_time_slots[time_slot] else "sold-out-count"
-        
-        html += f'<th class="{header_class}">'
-        html += f'{time_slot_display}'
-        html += f'<span class="{count_class}">{sold_out_count}</span>'
-        html += '</th>'
-    
-    html += "</tr></thead>"
-    
-    # データ行
-    html += "<tbody>"
-    
-    for member_name in filtered_member_names:
         # メンバーのURLを取得（通常枠と最終枠の両方）
-        member_url_dict = member_urls.get(member_name, {})
-        normal_url = member_url_dict.get("normal", "#")
-        
-        html += "<tr>"
-        
-        # メンバー名セル - 縦方向中央揃えのためのフレックスボックスコンテナを使用
-        formatted_name = format_member_name(member_name)
-        sales_count = member_sales_count[member_name]
+        normal_url = member_urls.get(member_name, {}).get("normal", "#")
         
-        html += f'<td class="member-cell">'
-        html += f'<div class="member-name-container">'
-        html += f'<a href="{normal_url}" target="_blank" class="member-link">{formatted_name}</a>'
-        html += f'<span class="member-sales-count">{sales_count}</span>'
-        html += f'</div></td>'
-        
-        # メンバーの時間帯ごとの状態セル
-        member_data = inventory_data.get(member_name, {})
-        
-        for time_slot in sorted_time_slots:
-            status = member_data.get(time_slot, "")
-            
-            # ステータスの表示とクラス設定
-            if status == "◎" or status == "⚪︎" or status == "○":
-                display_status = "○"
-                status_class = "last-one"
-            elif status == "×":
-                display_status = status
-                status_class = "sold-out"
-            elif status == "🔒":
-                display_status = status
-                status_class = "locked"
-            else:
-                display_status = status
-                status_class = ""
-            
-            html += f'<td class="status-cell {status_class}">{display_status}</td>'
+        # 取得待ちのメンバーはプレースホルダーを表示
+        if member_name in pending_members:
+            statuses = pending_statuses
+        else:
+            member_data = inventory_data.get(member_name, {})
+            statuses = tuple(member_data.get(time_slot, "") for time_slot in sorted_time_slots)
         
-        html += "</tr>"
-    
-    html += "</tbody></table></div>"
+        parts.append(render_member_row(
+            member_name, normal_url, member_sales_count[member_name],
+            member_name in stale_members, statuses
+        ))
+    parts.append(TABLE_END)
     
-    return html
+    return "".join(parts)
 
-def determine_crowded_time_slots(sorted_time_slots, sold_out_counts):
+def determine_crowded_time_slots(sorted_time_slots, sold_out_counts, threshold=CROWDED_THRESHOLD):
     """
     混雑時間帯を判定
     
     Args:
         sorted_time_slots (list): ソートされた時間帯のリスト
         sold_out_counts (dict): 時間帯と完売数のマッピング
+        threshold (int): 混雑とみなす完売数
         
     Returns:
         dict: 時間帯と混雑状態のマッピング
     """
     crowded_time_slots = {}
     for time_slot in sorted_time_slots:
-        # 全時間帯で通常の混雑判定: 15人以上が売り切れの場合は混雑マーク
-        crowded_time_slots[time_slot] = (sold_out_counts[time_slot] >= 15)
+        # 全時間帯で通常の混雑判定: 閾値（既定15人）以上が売り切れの場合は混雑マーク
+        crowded_time_slots[time_slot] = (sold_out_counts[time_slot] >= threshold)
     
     return crowded_time_slots
 